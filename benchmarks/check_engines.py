@@ -0,0 +1,136 @@
+import argparse
+import contextlib
+import csv
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+
+from generate_roster import generate_roster
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_10_DIR = os.path.join(REPO_DIR, 'gui_10')
+# Filter selections every engine is checked with; BOSP alone and mixed with tuition groups hit different predicates.
+FILTER_SETS = [
+    [],
+    ['SCPD NDO'],
+    ['BOSP'],
+    ['SCPD NDO', 'BOSP'],
+    ['Engineering Graduate', 'Undergraduate Full Time', "Honor's Coop - Engineering"],
+    ['No Such Group'],
+]
+# Every this many rows, the Study Agreement Code is blanked, as happens in real exports.
+BLANK_AGREEMENT_EVERY = 37
+# Engines that need an optional package, which are skipped when it is not installed.
+ENGINE_REQUIREMENTS = {'columnar': 'pandas'}
+# Engines that report a course that fails and carry on with the rest, so they are not checked on broken rosters.
+ENGINES_THAT_CONTINUE = {'per_course'}
+
+
+def blank_agreements(input_file, every=BLANK_AGREEMENT_EVERY):
+    """Blank the Study Agreement Code of every n-th row of a generated roster, in place."""
+    with open(input_file, newline='') as f:
+        rows = list(csv.reader(f))
+    column = rows[0].index('Study Agreement Code')
+    for row in rows[every::every]:
+        row[column] = ''
+    with open(input_file, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+
+def break_name(input_file):
+    """Drop the comma from the last row's Last First Name, so every engine should raise the same error."""
+    with open(input_file, newline='') as f:
+        rows = list(csv.reader(f))
+    column = rows[0].index('Last First Name')
+    rows[-1][column] = rows[-1][column].replace(',', '')
+    with open(input_file, 'w', newline='') as f:
+        csv.writer(f).writerows(rows)
+
+
+def run_engine(process5, engine, input_file, filters, work_dir, include_empty):
+    """Run one engine and return its roster files as {name: bytes}, or the type of the exception it raised."""
+    output_dir = tempfile.mkdtemp(dir=work_dir)
+    options = {'use_cache': False}
+    runs = 1
+    if engine == 'single_pass:cached':
+        # The second run reads the roster cached by the first.
+        engine, options, runs = 'single_pass', {'use_cache': True, 'cache_dir': os.path.join(work_dir, 'cache')}, 2
+    elif engine == 'sqlite':
+        options['index_path'] = os.path.join(work_dir, 'roster_index.sqlite')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(runs - 1):
+                process5.compute(input_file, tempfile.mkdtemp(dir=work_dir), list(filters), engine=engine, **options)
+            output_dir = process5.compute(input_file, output_dir, list(filters), engine=engine,
+                                          include_empty=include_empty, **options)
+    except Exception as e:
+        return type(e)
+    files = {}
+    for name in os.listdir(output_dir):
+        with open(os.path.join(output_dir, name), 'rb') as f:
+            files[name] = f.read()
+    return files
+
+
+def describe(result):
+    """Summarize an engine result for the report."""
+    if isinstance(result, type):
+        return f'raised {result.__name__}'
+    return f'{len(result)} files'
+
+
+def main():
+    """Entry point for the script. Exits with status 1 if any engine's output differs from single_pass."""
+    parser = argparse.ArgumentParser(description="Check that every gui_10 engine writes the same rosters as single_pass.")
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--courses', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sys.path.insert(0, GUI_10_DIR)
+    import process5
+
+    engines = [engine for engine in process5.ENGINES if engine != 'single_pass'] + ['single_pass:cached']
+    for engine, requirement in ENGINE_REQUIREMENTS.items():
+        if importlib.util.find_spec(requirement) is None:
+            print(f'{engine:<20} skipped ({requirement} is not installed)')
+            engines.remove(engine)
+    failures = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        rosters = []
+        for label, study_agreement in [('with BOSP column', True), ('without BOSP column', False)]:
+            input_file = os.path.join(work_dir, f'roster_{len(rosters)}.csv')
+            generate_roster(input_file, rows=args.rows, courses=args.courses, study_agreement=study_agreement,
+                            extra_columns=3, seed=args.seed)
+            rosters.append((label, input_file))
+        blank_file = os.path.join(work_dir, 'roster_blank.csv')
+        generate_roster(blank_file, rows=args.rows, courses=args.courses, extra_columns=3, seed=args.seed)
+        blank_agreements(blank_file)
+        rosters.append(('with blank agreement codes', blank_file))
+        broken_file = os.path.join(work_dir, 'roster_broken.csv')
+        generate_roster(broken_file, rows=args.rows, courses=args.courses, extra_columns=3, seed=args.seed)
+        break_name(broken_file)
+        rosters.append(('with a name missing its comma', broken_file))
+
+        for label, input_file in rosters:
+            for filters in FILTER_SETS:
+                for include_empty in (False, True):
+                    expected = run_engine(process5, 'single_pass', input_file, filters, work_dir, include_empty)
+                    for engine in engines:
+                        if input_file == broken_file and engine in ENGINES_THAT_CONTINUE:
+                            continue
+                        result = run_engine(process5, engine, input_file, filters, work_dir, include_empty)
+                        status = 'ok' if result == expected else f'MISMATCH ({describe(result)} vs {describe(expected)})'
+                        case = f'{label}, filters={filters}' + (', include_empty' if include_empty else '')
+                        print(f'{engine:<20} {case:<100} {status}')
+                        if result != expected:
+                            failures.append(f'{engine} {case}')
+
+    if failures:
+        sys.exit(f'{len(failures)} engine runs differ from single_pass:\n' + '\n'.join(failures))
+    print('All engines match single_pass.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import csv
+import random
+
+# Columns the parsers read, in the order the registrar export lists them.
+ROSTER_COLUMNS = [
+    'Course Offering Subject-Num Desc', 'EMPLID', 'Preferred Email Address', 'Last First Name',
+    'SUNet ID', 'Tuition Group Desc', 'Stu Current Acad Plan Code'
+]
+TUITION_GROUPS = {
+    'Engineering Graduate': 40,
+    'Undergraduate Full Time': 25,
+    "Honor's Coop - Engineering": 15,
+    "Honor's Coop - Regular": 5,
+    'SCPD NDO': 15,
+}
+SUBJECTS = ['CS', 'EE', 'ME', 'MS&E', 'CME', 'AA', 'BIOE', 'CEE', 'STATS', 'MATH']
+PLAN_CODES = ['CS-MS', 'EE-MS', 'ME-MS', 'MSE-MS', 'CME-MS', 'CS-PHD', 'EE-PHD', 'ND', 'CS-BS', 'EE-BS']
+LAST_NAMES = ['Nguyen', 'Smith', 'Garcia', "O'Brien", 'Chen', 'Patel', 'Kim', 'Johnson', 'Lopez', 'Williams']
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Priya', 'Wei', 'Maria', 'John "JJ"', 'Ana Lucia', 'Chris']
+# Study Agreement Codes; those starting with O or X mark BOSP students.
+BOSP_AGREEMENTS = ['OXF', 'OBER', 'XFLR']
+OTHER_AGREEMENTS = ['STD', 'HCP', 'NDO']
+
+
+def parse_weights(text):
+    """Parse 'key:weight,key:weight' into a dict of weights."""
+    weights = {}
+    for item in text.split(','):
+        key, weight = item.rsplit(':', 1)
+        weights[key.strip()] = float(weight)
+    return weights
+
+
+def make_courses(course_count, rng):
+    """Build course names with Zipf-like enrollment weights, so a few courses are very large."""
+    courses = []
+    for index in range(course_count):
+        subject = SUBJECTS[index % len(SUBJECTS)]
+        number = 100 + index // len(SUBJECTS)
+        suffix = rng.choice(['', 'A', 'B', 'C'])
+        courses.append(f'{subject} {number}{suffix}')
+    # Deduplicate names while keeping the order stable for the seed.
+    courses = list(dict.fromkeys(courses))
+    weights = [1 / (rank + 1) for rank in range(len(courses))]
+    return courses, weights
+
+
+def make_student(index, rng, tuition_groups, bosp_ratio):
+    """Build the fixed fields of one student."""
+    last_name = f'{rng.choice(LAST_NAMES)}{index}'
+    first_name = rng.choice(FIRST_NAMES)
+    if rng.random() < 0.05:
+        # Some exports carry suffixes with extra commas, or line breaks inside the quoted name.
+        first_name += rng.choice([', Jr.', '\nII'])
+    sunet_id = f'stu{index:07d}'
+    tuition_group = rng.choices(list(tuition_groups), weights=list(tuition_groups.values()))[0]
+    agreement = rng.choice(BOSP_AGREEMENTS if rng.random() < bosp_ratio else OTHER_AGREEMENTS)
+    return {
+        'EMPLID': str(10000000 + index),
+        'Preferred Email Address': f'{sunet_id}@stanford.edu',
+        'Last First Name': f'{last_name},{first_name}',
+        'SUNet ID': sunet_id,
+        'Tuition Group Desc': tuition_group,
+        'Study Agreement Code': agreement,
+    }
+
+
+def generate_roster(output_file, rows=10000, courses=1500, courses_per_student=None, duplicate_ratio=0.05,
+                    bosp_ratio=0.05, tuition_groups=None, study_agreement=True, extra_columns=20, seed=0):
+    """Write a deterministic synthetic registrar roster and return the number of data rows written.
+
+    courses_per_student maps a course count to its weight, e.g. {1: 5, 2: 3, 3: 2}.
+    duplicate_ratio is the share of rows that repeat an earlier enrollment under
+    another plan code, as happens for students with several plans.
+    """
+    rng = random.Random(seed)
+    courses_per_student = courses_per_student or {1: 4, 2: 3, 3: 2, 4: 1}
+    tuition_groups = tuition_groups or TUITION_GROUPS
+    course_names, course_weights = make_courses(courses, rng)
+    loads = [int(load) for load in courses_per_student]
+    load_weights = list(courses_per_student.values())
+
+    columns = list(ROSTER_COLUMNS)
+    if study_agreement:
+        columns.append('Study Agreement Code')
+    filler_columns = [f'Registrar Field {index}' for index in range(extra_columns)]
+    columns += filler_columns
+
+    written = 0
+    enrollments = []
+    student_index = 0
+    with open(output_file, 'w', newline='') as csv_output:
+        writer = csv.writer(csv_output)
+        writer.writerow(columns)
+        while written < rows:
+            if enrollments and rng.random() < duplicate_ratio:
+                enrollment = dict(rng.choice(enrollments))
+                enrollment['Stu Current Acad Plan Code'] = rng.choice(PLAN_CODES)
+                writer.writerow(make_record(enrollment, columns, filler_columns, rng))
+                written += 1
+                continue
+
+            student = make_student(student_index, rng, tuition_groups, bosp_ratio)
+            student_index += 1
+            load = rng.choices(loads, weights=load_weights)[0]
+            taken = dict.fromkeys(rng.choices(course_names, weights=course_weights, k=load))
+            for course_name in taken:
+                if written >= rows:
+                    break
+                enrollment = dict(student)
+                enrollment['Course Offering Subject-Num Desc'] = course_name
+                enrollment['Stu Current Acad Plan Code'] = rng.choice(PLAN_CODES)
+                if len(enrollments) < 100000:
+                    enrollments.append(enrollment)
+                writer.writerow(make_record(enrollment, columns, filler_columns, rng))
+                written += 1
+    return written
+
+
+def make_record(row, columns, filler_columns, rng):
+    """Lay a row out in column order, filling the unused registrar columns."""
+    record = dict(row)
+    for column in filler_columns:
+        record[column] = str(rng.randint(0, 99999))
+    return [record.get(column, '') for column in columns]
+
+
+def main():
+    """Entry point for the script."""
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic SCPD roster CSV.")
+    parser.add_argument('output_file')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--courses', type=int, default=1500)
+    parser.add_argument('--courses-per-student', type=parse_weights, default=None,
+                        help="Weights of how many courses a student takes, e.g. '1:4,2:3,3:2,4:1'")
+    parser.add_argument('--duplicate-ratio', type=float, default=0.05)
+    parser.add_argument('--bosp-ratio', type=float, default=0.05)
+    parser.add_argument('--tuition-groups', type=parse_weights, default=None,
+                        help="Tuition Group Desc weights, e.g. 'SCPD NDO:1,Engineering Graduate:3'")
+    parser.add_argument('--no-study-agreement', action='store_true',
+                        help="Leave out the Study Agreement Code (BOSP) column")
+    parser.add_argument('--extra-columns', type=int, default=20,
+                        help="Unused registrar columns to pad each row with")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    written = generate_roster(
+        args.output_file, rows=args.rows, courses=args.courses, courses_per_student=args.courses_per_student,
+        duplicate_ratio=args.duplicate_ratio, bosp_ratio=args.bosp_ratio, tuition_groups=args.tuition_groups,
+        study_agreement=not args.no_study_agreement, extra_columns=args.extra_columns, seed=args.seed
+    )
+    print(f'Wrote {written} rows to {args.output_file}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from generate_roster import generate_roster
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every parser variant and engine that can be benchmarked, as (name, directory, entry point).
+TARGETS = [
+    ('process.py fillOneFile', REPO_DIR, 'fill_one_file_loop'),
+    ('process.py fillAllFiles', REPO_DIR, 'fill_all_files'),
+    ('gui_feature fillOneFile', os.path.join(REPO_DIR, 'gui_feature'), 'fill_one_file_loop'),
+    ('gui_9 compute', os.path.join(REPO_DIR, 'gui_9'), 'compute'),
+    ('gui_10 per_course', os.path.join(REPO_DIR, 'gui_10'), 'engine:per_course'),
+    ('gui_10 single_pass', os.path.join(REPO_DIR, 'gui_10'), 'engine:single_pass'),
+    ('gui_10 single_pass cached', os.path.join(REPO_DIR, 'gui_10'), 'engine:single_pass:cached'),
+    ('gui_10 columnar', os.path.join(REPO_DIR, 'gui_10'), 'engine:columnar'),
+    ('gui_10 chunked', os.path.join(REPO_DIR, 'gui_10'), 'engine:chunked'),
+    ('gui_10 shared_memory', os.path.join(REPO_DIR, 'gui_10'), 'engine:shared_memory'),
+    ('gui_10 sqlite', os.path.join(REPO_DIR, 'gui_10'), 'engine:sqlite'),
+    ('gui_10 sqlite kept index', os.path.join(REPO_DIR, 'gui_10'), 'engine:sqlite:cached'),
+]
+# Tuition Group Desc values present in every variant's interactive or GUI options.
+DEFAULT_FILTERS = ['SCPD NDO', "Honor's Coop - Engineering", 'Engineering Graduate', 'Undergraduate Full Time']
+
+
+def run_one(target_dir, entry_point, input_file, output_dir, filters):
+    """Run one parser variant in this process and print its timings as JSON."""
+    sys.path.insert(0, target_dir)
+    module_name = 'process' if target_dir == REPO_DIR else 'process5'
+    module = __import__(module_name)
+
+    if entry_point.endswith(':cached'):
+        # Parse or index once into a private cache before timing, so the timed run is a cache hit.
+        cache_dir = tempfile.mkdtemp()
+        module.compute(input_file, tempfile.mkdtemp(), list(filters), engine=entry_point.split(':')[1], use_cache=True,
+                       cache_dir=cache_dir)
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    if entry_point == 'fill_one_file_loop':
+        for course_name in module.getClasses(input_file):
+            module.fillOneFile(course_name, input_file, output_dir, list(filters))
+    elif entry_point == 'fill_all_files':
+        module.fillAllFiles(input_file, output_dir, None, list(filters))
+    elif entry_point == 'compute':
+        output_dir = module.compute(input_file, output_dir, list(filters)) or output_dir
+    elif entry_point.endswith(':cached'):
+        engine = entry_point.split(':')[1]
+        output_dir = module.compute(input_file, output_dir, list(filters), engine=engine, use_cache=True,
+                                    cache_dir=cache_dir)
+    else:
+        engine = entry_point.split(':', 1)[1]
+        output_dir = module.compute(input_file, output_dir, list(filters), engine=engine, use_cache=False)
+    wall = time.perf_counter() - start
+
+    files = 0
+    for _, _, names in os.walk(output_dir):
+        files += sum(1 for name in names if name.endswith('.csv'))
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    result = {
+        'wall': wall,
+        'cpu': time.process_time() - cpu_start + children.ru_utime + children.ru_stime,
+        'files': files,
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        'peak_rss_kb': max(own.ru_maxrss, children.ru_maxrss) // (1024 if sys.platform == 'darwin' else 1),
+    }
+    print('BENCHMARK_RESULT ' + json.dumps(result))
+
+
+def benchmark(name, target_dir, entry_point, input_file, rows, filters, timeout):
+    """Run one target in a fresh interpreter and return its result row."""
+    with tempfile.TemporaryDirectory() as output_dir:
+        cmd = [sys.executable, os.path.abspath(__file__), '--run-one', target_dir, entry_point,
+               input_file, output_dir] + ['--filters'] + filters
+        try:
+            completed = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {'target': name, 'rows': rows, 'status': f'timeout after {timeout}s'}
+
+    for line in completed.stdout.splitlines():
+        if line.startswith('BENCHMARK_RESULT '):
+            result = json.loads(line.split(' ', 1)[1])
+            result.update({
+                'target': name,
+                'rows': rows,
+                'status': 'ok',
+                'rows_per_s': rows / result['wall'] if result['wall'] else 0.0,
+                'files_per_s': result['files'] / result['wall'] if result['wall'] else 0.0,
+            })
+            return result
+    error = (completed.stderr.strip().splitlines() or ['no output'])[-1]
+    return {'target': name, 'rows': rows, 'status': f'failed: {error}'}
+
+
+def print_table(results):
+    """Print the results as an aligned table."""
+    print(f"{'target':<26} {'rows':>9} {'wall s':>9} {'rows/s':>11} {'files/s':>9} {'files':>6} {'peak MB':>8}  status")
+    for result in results:
+        if result['status'] == 'ok':
+            print(f"{result['target']:<26} {result['rows']:>9} {result['wall']:>9.2f} {result['rows_per_s']:>11.0f} "
+                  f"{result['files_per_s']:>9.0f} {result['files']:>6} {result['peak_rss_kb'] / 1024:>8.1f}  ok")
+        else:
+            print(f"{result['target']:<26} {result['rows']:>9} {'':>9} {'':>11} {'':>9} {'':>6} {'':>8}  {result['status']}")
+
+
+def main():
+    """Entry point for the script."""
+    parser = argparse.ArgumentParser(description="Benchmark the roster parser variants on synthetic rosters.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help="Roster sizes in rows (default: 10k 100k 1M)")
+    parser.add_argument('--courses', type=int, default=1500)
+    parser.add_argument('--targets', nargs='+', default=None,
+                        help="Only run targets whose name contains one of these strings")
+    parser.add_argument('--filters', nargs='*', default=DEFAULT_FILTERS)
+    parser.add_argument('--timeout', type=int, default=600, help="Seconds allowed per run (default: 600)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    parser.add_argument('--run-one', nargs=4, metavar=('DIR', 'ENTRY', 'INPUT', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        run_one(*args.run_one, args.filters)
+        return
+
+    targets = [target for target in TARGETS
+               if not args.targets or any(pattern in target[0] for pattern in args.targets)]
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in args.sizes:
+            input_file = os.path.join(work_dir, f'roster_{rows}.csv')
+            generate_roster(input_file, rows=rows, courses=args.courses, seed=args.seed)
+            for name, target_dir, entry_point in targets:
+                result = benchmark(name, target_dir, entry_point, input_file, rows, args.filters, args.timeout)
+                results.append(result)
+                print(f"{name} on {rows} rows: {result['status']}", flush=True)
+
+    print()
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
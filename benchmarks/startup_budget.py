@@ -0,0 +1,100 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from generate_roster import generate_roster
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_10_DIR = os.path.join(REPO_DIR, 'gui_10')
+
+# Children run with bytecode caching on, as users do, so imports are not recompiled every time.
+CHILD_ENV = {key: value for key, value in os.environ.items() if key != 'PYTHONDONTWRITEBYTECODE'}
+# Modules that must not be loaded just by importing the engine or by a small single-pass run.
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'tqdm', 'concurrent.futures', 'multiprocessing']
+
+
+def measure_imports(module_dir, module_name, repeat=5):
+    """Import a module under python -X importtime and return (best ms, names of imported modules).
+
+    The time is the module's cumulative import time, which includes everything
+    it pulls in but not interpreter startup. The first import also writes the
+    .pyc, so the best of several runs is reported.
+    """
+    code = f'import sys; sys.path.insert(0, {module_dir!r}); import {module_name}'
+    best_us = None
+    modules = set()
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                   capture_output=True, text=True, check=True, env=CHILD_ENV)
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            modules.add(name.strip())
+            if name.strip() == module_name and not name.startswith('  '):
+                best_us = int(cumulative) if best_us is None else min(best_us, int(cumulative))
+    return best_us / 1000, modules
+
+
+def measure_run(rows, courses):
+    """Run gui_10/process5.py on a small generated roster and return the wall time in ms and its imports."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_file = os.path.join(work_dir, 'roster.csv')
+        generate_roster(input_file, rows=rows, courses=courses, extra_columns=5)
+        # No options, so the run takes the same default path as users and the GUI.
+        cmd = [sys.executable, '-X', 'importtime', os.path.join(GUI_10_DIR, 'process5.py'), input_file, work_dir]
+        start = time.perf_counter()
+        completed = subprocess.run(cmd, capture_output=True, text=True, env=CHILD_ENV)
+        wall_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    modules = {line.split('|')[-1].strip() for line in completed.stderr.splitlines() if line.startswith('import time:')}
+    return wall_ms, modules
+
+
+def main():
+    """Entry point for the script. Exits with status 1 if any budget is exceeded."""
+    parser = argparse.ArgumentParser(description="Check the cold-start cost of the CLI entry points against a budget.")
+    parser.add_argument('--import-budget-ms', type=float, default=25.0,
+                        help="Allowed time to import an engine module (default: 25)")
+    parser.add_argument('--run-budget-ms', type=float, default=300.0,
+                        help="Allowed wall time for a whole small run, interpreter start included (default: 300)")
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--courses', type=int, default=20)
+    args = parser.parse_args()
+
+    failures = []
+    targets = [('process.py', REPO_DIR, 'process')]
+    for name in sorted(os.listdir(REPO_DIR)):
+        if os.path.isfile(os.path.join(REPO_DIR, name, 'process5.py')):
+            targets.append((f'{name}/process5.py', os.path.join(REPO_DIR, name), 'process5'))
+
+    for label, module_dir, module_name in targets:
+        try:
+            import_ms, modules = measure_imports(module_dir, module_name)
+        except subprocess.CalledProcessError as e:
+            print(f'{label:<36} import failed: {e.stderr.strip().splitlines()[-1]}')
+            failures.append(label)
+            continue
+        heavy = [module for module in HEAVY_MODULES if module in modules]
+        status = 'ok' if import_ms <= args.import_budget_ms else 'over budget'
+        print(f'{label:<36} import {import_ms:8.1f} ms  {status}' + (f'  (loads {", ".join(heavy)})' if heavy else ''))
+        if status != 'ok':
+            failures.append(label)
+
+    run_ms, modules = measure_run(args.rows, args.courses)
+    heavy = [module for module in HEAVY_MODULES if module in modules]
+    status = 'ok' if run_ms <= args.run_budget_ms and not heavy else 'over budget'
+    print(f'{"gui_10/process5.py small run":<36} wall   {run_ms:8.1f} ms  {status}'
+          + (f'  (loads {", ".join(heavy)})' if heavy else ''))
+    if status != 'ok':
+        failures.append('gui_10/process5.py small run')
+
+    if failures:
+        sys.exit(f'Startup budget exceeded: {", ".join(failures)}')
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,30 @@
 import os
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import subprocess
 import threading
 
+import process5
+
 csv_file_path = ""
 output_dir = ""
+# Latest progress reported by the engine, and the outcome of the last run. Written by the
+# worker thread and read by poll_progress on the Tk thread.
+run_state = {'running': False, 'progress': None, 'result': None, 'error': None}
 
-# Function to select the CSV file
+# Function to select the CSV files; several exports are merged into one set of rosters
 def select_csv():
     global csv_file_path
-    csv_file_path = filedialog.askopenfilename(
-        title="Select CSV File",
-        filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
-    )
+    csv_file_path = list(filedialog.askopenfilenames(
+        title="Select CSV Files",
+        filetypes=[("Roster files", "*.csv *.xlsx *.gz *.bz2 *.xz *.zip"), ("CSV files", "*.csv"), ("Excel workbooks", "*.xlsx"),
+                   ("Compressed exports", "*.gz *.bz2 *.xz *.zip"), ("All files", "*.*")]
+    ))
     if not csv_file_path:
         messagebox.showerror("Error", "No CSV file selected.")
+    elif len(csv_file_path) == 1:
+        csv_label.config(text=os.path.basename(csv_file_path[0]))
     else:
-        csv_label.config(text=os.path.basename(csv_file_path))
+        csv_label.config(text=f"{len(csv_file_path)} files")
 
 # Function to select the output directory
 def select_output_dir():
@@ -32,6 +39,9 @@ def select_output_dir():
 
 # Function to handle the deploy button click
 def deploy():
+    if run_state['running']:
+        return
+
     if not csv_file_path:
         messagebox.showerror("Error", "No CSV file selected.")
         return
@@ -42,78 +52,118 @@ def deploy():
 
     selected_indices = listbox.curselection()
     selected_values = [options[idx] for idx in selected_indices]
+    include_empty = include_empty_var.get()
+    use_cache = use_cache_var.get()
+
+    # Run the engine in a separate thread to keep the GUI responsive, and poll its progress
+    run_state.update(running=True, progress=None, result=None, error=None)
+    deploy_button.config(state=tk.DISABLED)
+    progress_bar['value'] = 0
+    status_label.config(text="Starting...")
+    threading.Thread(target=run_process, args=(csv_file_path, output_dir, selected_values, include_empty, use_cache),
+                     daemon=True).start()
+    root.after(100, poll_progress)
+
+# Function to run the engine in this process; it must not touch any Tk widgets
+def run_process(csv_file_path, output_dir, selected_values, include_empty, use_cache):
+    def report(rows_parsed, bytes_read, total_bytes, courses_written):
+        run_state['progress'] = (rows_parsed, bytes_read, total_bytes, courses_written)
 
-    # Start the progress bar and run the process5.py script in a separate thread to keep the GUI responsive
-    progress_bar.start()
-    threading.Thread(target=run_process_script, args=(csv_file_path, output_dir, selected_values)).start()
-
-# Function to run the process5.py script with two arguments
-def run_process_script(csv_file_path, output_dir, selected_values):
     try:
-        process5_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'process5.py')
-        cmd = ['python3', process5_path, csv_file_path, output_dir] + selected_values
-        print("Command for program:", cmd)
-        subprocess.run(cmd)
-    except FileNotFoundError:
-        messagebox.showerror("Python File Not Found", "Error: process5.py not found!")
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
+        run_state['result'] = process5.compute(csv_file_path, output_dir, selected_values, include_empty=include_empty,
+                                              use_cache=use_cache, progress=report)
+    except (Exception, SystemExit) as e:
+        run_state['error'] = str(e)
     finally:
-        progress_bar.stop()
-        root.quit()  # Close the GUI window after processing
-
-# Create the main window
-root = tk.Tk()
-root.title("SCPD Auto Parser")
-
-# Create a style for the button
-style = ttk.Style()
-style.configure("Blue.TButton", background="blue")
-
-instruction_label = tk.Label(root, text="This program takes in a Roster CSV file, sorts it per class, and applies filters if any.", justify=tk.LEFT)
-instruction_label.pack(pady=10)
-
-# Heading for the checkboxes
-label1 = tk.Label(root, text="1. Select filters (can do multiple), if any:")
-label1.pack(pady=10)
-
-# Create a list of options for the dropdown
-options = ["Honor's Coop - Engineering", "Honor's Coop - Regular", "SCPD NDO", "BOSP"]
-
-# Create a Listbox widget for multiple selection
-listbox = tk.Listbox(root, selectmode=tk.MULTIPLE)
-for option in options:
-    listbox.insert(tk.END, option)
-listbox.pack(pady=10)
-
-label2 = tk.Label(root, text="2. Choose the input Roster CSV file:")
-label2.pack(pady=10)
-
-# Create buttons for selecting CSV file and output directory
-csv_button = tk.Button(root, text="Select Roster File (csv)", command=select_csv, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=20)
-csv_button.pack(pady=5)
-csv_label = tk.Label(root, text="")
-csv_label.pack(pady=5)
-
-label3 = tk.Label(root, text="3. Choose where to save the output files:")
-label3.pack(pady=10)
-
-output_button = tk.Button(root, text="Select Output Folder", command=select_output_dir, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=25)
-output_button.pack(pady=5)
-output_label = tk.Label(root, text="")
-output_label.pack(pady=5)
-
-
-label4 = tk.Label(root, text="4. Finally, deploy program to have it do its magic:")
-label4.pack(pady=10)
-
-# Create a button to deploy the program
-deploy_button = tk.Button(root, text="Deploy", command=deploy, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=40)
-deploy_button.pack(pady=20)
-
-# Create a progress bar
-progress_bar = ttk.Progressbar(root, mode='indeterminate')
-progress_bar.pack(pady=10)
+        run_state['running'] = False
+
+# Function to update the progress bar from the engine's latest report
+def poll_progress():
+    progress = run_state['progress']
+    if progress:
+        rows_parsed, bytes_read, total_bytes, courses_written = progress
+        progress_bar['value'] = 100 * bytes_read / total_bytes if total_bytes else 100
+        status_label.config(text=f"{rows_parsed:,} rows parsed, {courses_written:,} rosters written")
+
+    if run_state['running']:
+        root.after(100, poll_progress)
+        return
 
-# Start the GUI main loop
-root.mainloop()
+    deploy_button.config(state=tk.NORMAL)
+    if run_state['error']:
+        status_label.config(text="Failed.")
+        messagebox.showerror("Error", run_state['error'])
+    else:
+        progress_bar['value'] = 100
+        status_label.config(text=f"Done. Rosters saved to {os.path.basename(run_state['result'])}")
+
+# Build the window only when run as a script, so process pool workers that re-import
+# this module (spawn start method on macOS and Windows) do not open windows of their own
+if __name__ == '__main__':
+    # Create the main window
+    root = tk.Tk()
+    root.title("SCPD Auto Parser")
+
+    # Create a style for the button
+    style = ttk.Style()
+    style.configure("Blue.TButton", background="blue")
+
+    instruction_label = tk.Label(root, text="This program takes in a Roster CSV file, sorts it per class, and applies filters if any.", justify=tk.LEFT)
+    instruction_label.pack(pady=10)
+
+    # Heading for the checkboxes
+    label1 = tk.Label(root, text="1. Select filters (can do multiple), if any:")
+    label1.pack(pady=10)
+
+    # Create a list of options for the dropdown
+    options = ["Honor's Coop - Engineering", "Honor's Coop - Regular", "SCPD NDO", "BOSP"]
+
+    # Create a Listbox widget for multiple selection
+    listbox = tk.Listbox(root, selectmode=tk.MULTIPLE)
+    for option in options:
+        listbox.insert(tk.END, option)
+    listbox.pack(pady=10)
+
+    # Checkbox to also write header-only rosters for courses the filters leave empty
+    include_empty_var = tk.BooleanVar(value=False)
+    include_empty_check = tk.Checkbutton(root, text="Also create rosters for courses with no matching students", variable=include_empty_var)
+    include_empty_check.pack(pady=5)
+
+    # Checkbox to keep the parsed roster on disk, so re-running the same export with other filters skips parsing
+    use_cache_var = tk.BooleanVar(value=False)
+    use_cache_check = tk.Checkbutton(root, text="Reuse the parsed roster when the same file is run again", variable=use_cache_var)
+    use_cache_check.pack(pady=5)
+
+    label2 = tk.Label(root, text="2. Choose the input Roster CSV file(s):")
+    label2.pack(pady=10)
+
+    # Create buttons for selecting CSV file and output directory
+    csv_button = tk.Button(root, text="Select Roster File (csv)", command=select_csv, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=20)
+    csv_button.pack(pady=5)
+    csv_label = tk.Label(root, text="")
+    csv_label.pack(pady=5)
+
+    label3 = tk.Label(root, text="3. Choose where to save the output files:")
+    label3.pack(pady=10)
+
+    output_button = tk.Button(root, text="Select Output Folder", command=select_output_dir, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=25)
+    output_button.pack(pady=5)
+    output_label = tk.Label(root, text="")
+    output_label.pack(pady=5)
+
+
+    label4 = tk.Label(root, text="4. Finally, deploy program to have it do its magic:")
+    label4.pack(pady=10)
+
+    # Create a button to deploy the program
+    deploy_button = tk.Button(root, text="Deploy", command=deploy, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=40)
+    deploy_button.pack(pady=20)
+
+    # Create a progress bar
+    progress_bar = ttk.Progressbar(root, mode='determinate', maximum=100, length=300)
+    progress_bar.pack(pady=10)
+    status_label = tk.Label(root, text="")
+    status_label.pack(pady=5)
+
+    # Start the GUI main loop
+    root.mainloop()
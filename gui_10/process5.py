@@ -1,11 +1,52 @@
 import csv
 import os
-import datetime
-import time
-import pandas as pd
+import io
 import sys
-from tqdm import tqdm
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import time
+
+from profiling import NULL_PROFILE, RunProfile
+from rosters import (
+    BOSP_AGREEMENT_PREFIXES, DedupIndex, ROSTER_EXTENSIONS, compile_row_filter, get_compression,
+    get_current_datetime, get_input_size, get_output_columns, get_row_getters, is_compressed,
+    is_xlsx, iter_partitioned_rows, iter_rows_with_progress, list_zip_rosters, open_roster,
+    split_zip_member,
+)
+from writers import (
+    MAX_OPEN_FILES, OUTPUT_FORMATS, ROSTER_GROUPINGS, RosterWriter, WriterPool, get_heading_row,
+    get_output_path, get_output_target, open_parquet_export, open_writer_pool, write_file_atomically,
+    write_roster_header,
+)
+from roster_cache import get_cache_dir, get_cached_roster, iter_roster_rows
+from roster_index import (
+    ROSTER_INDEX_FILE, connect_roster_index, count_course_students, find_student_courses,
+    iter_index_rows_by_course, open_roster_index,
+)
+
+# pandas, tqdm, concurrent.futures, multiprocessing, hashlib, marshal and array are imported
+# inside the code paths that use them, so a small single-pass run does not pay for loading them.
+
+# Inputs smaller than this are processed without a tqdm progress bar.
+PROGRESS_BAR_MIN_BYTES = 1 << 20
+# Start methods accepted by --start-method; not every platform supports all of them.
+START_METHODS = ['fork', 'spawn', 'forkserver']
+
+
+def progress_bar(iterable, **kwargs):
+    """Wrap iterable in a tqdm progress bar, importing tqdm on first use."""
+    from tqdm import tqdm
+    return tqdm(iterable, **kwargs)
+
+
+def worker_pool(executor=None, workers=None, start_method=None):
+    """Return a context manager giving executor, left running on exit, or a new process pool."""
+    import contextlib
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    if executor is not None:
+        return contextlib.nullcontext(executor)
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+
 
 def get_classes(file):
     """Retrieve unique class names from a CSV file."""
@@ -18,15 +59,14 @@ def get_classes(file):
         print(f"Error reading classes: {e}")
         raise
 
-def get_current_datetime(fmt='%m-%d %I:%M:%S %p'):
-    """Get the current date and time formatted according to the provided format."""
-    return datetime.datetime.now().strftime(fmt)
-
-def make_dir(output_dir):
-    """Create a directory for storing class files."""
+def make_dir(output_dir, create=True):
+    """Create a directory for storing class files, or with create False only return its path."""
     try:
         dir_name = 'Classes_' + get_current_datetime()
         directory_path = os.path.join(output_dir, dir_name)
+        if not create:
+            os.makedirs(output_dir, exist_ok=True)
+            return directory_path
         os.makedirs(directory_path, exist_ok=True)
         print('Classes Folder Successfully Created on', get_current_datetime())
         return directory_path
@@ -34,217 +74,1200 @@ def make_dir(output_dir):
         print(f"Error creating directory: {e}")
         raise
 
-def make_one_file(file_path):
-    """Create a single empty file at the specified path."""
+
+def get_filtered_rows(course_name, reader, getters, tuition_filter_list):
+    """Yield the filtered, deduplicated rows of one course from a csv.reader as output tuples."""
+    filter_getter = getters[0]
+    course_rows = (row for row in reader if row and filter_getter(row)[0] == course_name)
+    for _, output_row in iter_partitioned_rows(course_rows, getters, tuition_filter_list):
+        if output_row is not None:
+            yield output_row
+
+
+def fill_one_file(course_name, input_file, directory_path, tuition_filter_list, include_empty=False):
+    """Fill a single class file with filtered student data from the input CSV."""
+    date = get_current_datetime('%m-%d')
+    output_file = get_output_path(directory_path, course_name, date)
+
+    try:
+        with open(input_file, 'r') as csv_input:
+            reader = csv.reader(csv_input)
+            getters = get_row_getters(next(reader, []))
+            rows = get_filtered_rows(course_name, reader, getters, tuition_filter_list)
+            first_row = next(rows, None)
+            if first_row is None and not include_empty:
+                return
+
+            desired_columns = get_output_columns(getters[2])
+            with RosterWriter(output_file) as writer:
+                writer.writerow(get_heading_row(course_name, desired_columns).values())
+                writer.writerow(desired_columns)
+                if first_row is not None:
+                    writer.writerow(first_row)
+                    writer.writerows(rows)
+    except Exception as e:
+        print(f"Error filling file {course_name}: {e}")
+        raise
+
+
+def partition_rows(input_file, tuition_filter_list, cache_dir=None, progress=None, profile=NULL_PROFILE):
+    """Read the input once, filtering and deduplicating rows into one list per course."""
+    partitions = {}
+
+    def collect(rows):
+        for course_name, output_row in rows:
+            if output_row is None:
+                partitions[course_name] = []
+            else:
+                partitions[course_name].append(output_row)
+
+    try:
+        if cache_dir:
+            with profile.stage('load_roster'):
+                roster = get_cached_roster(input_file, cache_dir, progress)
+            profile.counters['rows_in'] += len(roster['rows']['course'])
+            with profile.stage('partition'):
+                collect(iter_roster_rows(roster, tuition_filter_list, profile.counters))
+            if progress:
+                total_bytes = get_input_size(input_file)
+                progress(len(roster['rows']['course']), total_bytes, total_bytes, 0)
+            return partitions, roster['bosp_col_exists']
+
+        roster_input, reader, tell = open_roster(input_file)
+        with roster_input:
+            getters = get_row_getters(next(reader, []))
+            reader = profile.time_iter('read', reader, count='rows_in')
+            if progress:
+                reader = iter_rows_with_progress(reader, tell, get_input_size(input_file), progress, {})
+            rows = iter_partitioned_rows(reader, getters, tuition_filter_list, profile.counters, keep_rows=True)
+            collect(profile.time_iter('partition', rows))
+    except Exception as e:
+        print(f"Error partitioning rows: {e}")
+        raise
+
+    return partitions, getters[2]
+
+
+def write_partitions(partitions, directory_path, bosp_col_exists, max_open_files=MAX_OPEN_FILES, include_empty=False,
+                     output_format='csv', compress=False, sheets_by='course'):
+    """Write one roster file per course from the partitioned rows."""
+    date = get_current_datetime('%m-%d')
+    desired_columns = get_output_columns(bosp_col_exists)
+
+    with open_writer_pool(directory_path, max_open_files, output_format, compress, sheets_by) as pool:
+        for course_name, course_rows in progress_bar(partitions.items(), total=len(partitions), desc="Filling CSV files", unit="file"):
+            if not course_rows and not include_empty:
+                continue
+            output_file = get_output_path(directory_path, course_name, date)
+            write_roster_header(pool, output_file, course_name, desired_columns)
+            pool.writerows(output_file, course_rows)
+
+
+def export_partitions(partitions, dataset_dir, bosp_col_exists, partition_by='course'):
+    """Export the partitioned rows as a Parquet dataset in dataset_dir (see ParquetExport); a no-op if it is None."""
+    with open_parquet_export(dataset_dir, get_output_columns(bosp_col_exists), partition_by) as export:
+        if export:
+            for course_rows in partitions.values():
+                export.extend(course_rows)
+
+
+def find_record_boundaries(input_file, chunk_count, block_size=1 << 20):
+    """Split a csv.writer-quoted input into byte ranges that start and end on record boundaries."""
+    size = os.path.getsize(input_file)
+    # Offset 0 finds the end of the header; the rest are evenly spaced targets.
+    targets = [0] + [size * i // chunk_count for i in range(1, chunk_count)]
+    boundaries = []
+
+    with open(input_file, 'rb') as f:
+        offset = 0
+        inside_quotes = False
+        target_index = 0
+        while target_index < len(targets):
+            block = f.read(block_size)
+            if not block:
+                break
+            pos = 0
+            while target_index < len(targets):
+                target = max(targets[target_index] - offset, pos)
+                if target >= len(block):
+                    break
+                inside_quotes ^= bool(block.count(b'"', pos, target) & 1)
+                pos = target
+                newline = block.find(b'\n', pos)
+                while newline != -1:
+                    inside_quotes ^= bool(block.count(b'"', pos, newline) & 1)
+                    pos = newline + 1
+                    if not inside_quotes:
+                        break
+                    newline = block.find(b'\n', pos)
+                if newline == -1:
+                    # The record continues into the next block.
+                    targets[target_index] = offset + len(block)
+                    break
+                if not boundaries or offset + pos > boundaries[-1]:
+                    boundaries.append(offset + pos)
+                target_index += 1
+            inside_quotes ^= bool(block.count(b'"', pos) & 1)
+            offset += len(block)
+
+    if not boundaries:
+        return size, [size]
+    header_end = boundaries[0]
+    return header_end, [offset for offset in boundaries[1:] if offset < size] + [size]
+
+
+def partition_chunk(input_file, start, end, header, tuition_filter_list):
+    """Parse, filter and partition the records between two byte offsets of the input."""
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # Decode the same way open(input_file, 'r') does for the other engines.
+    reader = csv.reader(io.TextIOWrapper(io.BytesIO(data)))
+    rows_parsed = 0
+
+    def counted(rows):
+        nonlocal rows_parsed
+        for row in rows:
+            rows_parsed += 1
+            yield row
+
+    partitions = {}
+    rows = iter_partitioned_rows(counted(reader), get_row_getters(header), tuition_filter_list, keep_rows=True)
+    for course_name, output_row in rows:
+        if output_row is None:
+            partitions[course_name] = []
+        else:
+            partitions[course_name].append(output_row)
+    return partitions, rows_parsed
+
+
+def merge_partitions(partial_partitions):
+    """Merge per-chunk partitions in input order, dropping rows already seen in earlier chunks."""
+    merged = {}
+    seen = DedupIndex(pack=False)
+    for partitions in partial_partitions:
+        for course_name, course_rows in partitions.items():
+            merged_rows = merged.get(course_name)
+            if merged_rows is None:
+                merged_rows = merged[course_name] = []
+            for output_row in course_rows:
+                if seen.add(output_row[:6]):
+                    merged_rows.append(output_row)
+    return merged
+
+
+# Fields stored per row in a shared roster.
+SHARED_FIELDS = 7
+# Header of each row in a shared roster: its course id, then the byte length of each field.
+SHARED_ROW_HEADER = '%dI' % (SHARED_FIELDS + 1)
+
+def load_shared_roster(input_file, shard_count=1):
+    """Parse the input once into shared memory blocks, grouped by shard, that workers can read in place."""
+    import array
+    import struct
+    from multiprocessing import shared_memory
+
+    header = struct.Struct(SHARED_ROW_HEADER)
+    # Fields take no more room than the input they came from; headers and odd encodings may still outgrow it.
+    capacity = os.path.getsize(input_file) + (1 << 20)
+    data_block = shared_memory.SharedMemory(create=True, size=capacity)
+    buf = data_block.buf
+    pack_into = header.pack_into
+    header_size = header.size
+    shard_starts = [array.array('Q') for _ in range(shard_count)]
+    course_index = {}
+    size = 0
+
     try:
-        open(file_path, 'a').close()
-    except OSError as e:
-        print(f"Error creating the file: {e}")
+        with open(input_file, 'r') as csv_input:
+            reader = csv.reader(csv_input)
+            filter_getter, projector, bosp_col_exists = get_row_getters(next(reader, []))
+            agreement = ''
+            for row in reader:
+                if not row:
+                    continue
+                if bosp_col_exists:
+                    course_name, tuition_group, agreement = filter_getter(row)
+                else:
+                    course_name, tuition_group = filter_getter(row)
+                course_id = course_index.get(course_name)
+                if course_id is None:
+                    course_id = course_index[course_name] = len(course_index)
+                fields = [value.encode('utf-8', 'surrogatepass') for value in (tuition_group, agreement) + projector(row)]
+                body = b''.join(fields)
+                start = size + header_size
+                end = start + len(body)
+                if end > capacity:
+                    # Move what is written so far into a block twice the size.
+                    capacity = max(end, 2 * capacity)
+                    grown = shared_memory.SharedMemory(create=True, size=capacity)
+                    grown.buf[:size] = buf[:size]
+                    data_block.close()
+                    data_block.unlink()
+                    data_block = grown
+                    buf = data_block.buf
+                pack_into(buf, size, course_id, *map(len, fields))
+                buf[start:end] = body
+                shard_starts[course_id % shard_count].append(size)
+                size = end
+
+        shard_bounds = [0]
+        for starts in shard_starts:
+            shard_bounds.append(shard_bounds[-1] + len(starts))
+        index_block = shared_memory.SharedMemory(create=True, size=max(shard_bounds[-1] * 8, 8))
+    except BaseException:
+        data_block.close()
+        data_block.unlink()
         raise
+    # Copy each shard's starts through a view, without an intermediate bytes copy.
+    for shard, starts in enumerate(shard_starts):
+        index_block.buf[shard_bounds[shard] * 8:shard_bounds[shard + 1] * 8] = memoryview(starts).cast('B')
+
+    layout = {
+        'data_block': data_block.name,
+        'index_block': index_block.name,
+        'rows': shard_bounds[-1],
+        'shard_bounds': shard_bounds,
+        'courses': list(course_index),
+        'bosp_col_exists': bosp_col_exists,
+    }
+    return (data_block, index_block), layout
 
-def create_file(file, directory_path, date):
-    """Helper function to create a single file."""
-    file_path = os.path.join(directory_path, file.replace(' ', '') + f' SCPD Roster {date}.csv')
-    make_one_file(file_path)
-    return file_path
 
-def make_tree(input_file, output_dir):
-    """Create a directory and a set of files based on the classes listed in the input CSV."""
+def fill_shared_shard(layout, shard, tuition_filter_list, directory_path, max_open_files=MAX_OPEN_FILES,
+                      include_empty=False):
+    """Filter and write the courses of one shard of a shared roster."""
+    import struct
+    from multiprocessing import shared_memory
+
+    data_block = shared_memory.SharedMemory(name=layout['data_block'])
+    index_block = shared_memory.SharedMemory(name=layout['index_block'])
+    data = data_block.buf
+    starts = index_block.buf.cast('Q')
+
     try:
-        directory_path = make_dir(output_dir)
+        courses = layout['courses']
+        shard_count = len(layout['shard_bounds']) - 1
+        bosp_col_exists = layout['bosp_col_exists']
+        accept = compile_row_filter(tuition_filter_list, bosp_col_exists)
+        desired_columns = get_output_columns(bosp_col_exists)
         date = get_current_datetime('%m-%d')
-        list_of_files = get_classes(input_file)
-        
-        # Use ProcessPoolExecutor to create files concurrently
-        with ProcessPoolExecutor() as executor:
-            futures = {executor.submit(create_file, file, directory_path, date): file for file in list_of_files}
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Creating CSV files", unit="file"):
-                try:
-                    future.result() 
-                except Exception as e:
-                    print(f"Error creating file {futures[future]}: {e}")
-        
-        return directory_path, list_of_files
+        header = struct.Struct(SHARED_ROW_HEADER)
+
+        seen = DedupIndex()
+        output_files = {}
+        with WriterPool(max_open_files) as pool:
+            for index in range(layout['shard_bounds'][shard], layout['shard_bounds'][shard + 1]):
+                start = starts[index]
+                course_id, tuition_length, agreement_length, *lengths = header.unpack_from(data, start)
+                start += header.size
+                tuition_group = str(data[start:start + tuition_length], 'utf-8', 'surrogatepass')
+                start += tuition_length
+                agreement = str(data[start:start + agreement_length], 'utf-8', 'surrogatepass')
+                start += agreement_length
+                if not accept(tuition_group, agreement):
+                    continue
+
+                values = []
+                for length in lengths:
+                    values.append(str(data[start:start + length], 'utf-8', 'surrogatepass'))
+                    start += length
+                emplid, email, last_first_name, sunet_id, plan_code = values
+                course_name = courses[course_id]
+                last_name, comma, first_name = last_first_name.partition(',')
+                if not comma:
+                    raise ValueError(f"{course_name}: 'Last First Name' {last_first_name!r} has no comma")
+                compare_row = (course_name, emplid, email, last_name, first_name.strip(), sunet_id)
+                if not seen.add(compare_row):
+                    continue
+
+                output_file = output_files.get(course_name)
+                if output_file is None:
+                    output_file = output_files[course_name] = get_output_path(directory_path, course_name, date)
+                    write_roster_header(pool, output_file, course_name, desired_columns)
+                if bosp_col_exists:
+                    bosp = 'BOSP' if agreement[:1] in BOSP_AGREEMENT_PREFIXES else ''
+                    pool.writerow(output_file, compare_row + (tuition_group, plan_code, bosp))
+                else:
+                    pool.writerow(output_file, compare_row + (tuition_group, plan_code))
+
+            if include_empty:
+                for course_id in range(shard, len(courses), shard_count):
+                    course_name = courses[course_id]
+                    if course_name not in output_files:
+                        output_file = get_output_path(directory_path, course_name, date)
+                        write_roster_header(pool, output_file, course_name, desired_columns)
+                        output_files[course_name] = output_file
+        return len(output_files)
+    finally:
+        # Views into the blocks must be released before they can be closed.
+        starts.release()
+        data.release()
+        data_block.close()
+        index_block.close()
+
+
+def run_per_course(csv_file, output_dir, tuition_filter_list, workers=None, include_empty=False, start_method=None,
+                   progress=None, executor=None, profile=NULL_PROFILE):
+    """Legacy path: one full pass over the input per course, spread over a process pool."""
+    from concurrent.futures import as_completed
+
+    directory_path = make_dir(output_dir)
+    with profile.stage('classes'):
+        list_of_files = get_classes(csv_file)
+    total_bytes = os.path.getsize(csv_file)
+
+    # Use a process pool to fill files concurrently
+    with worker_pool(executor, workers, start_method) as executor, profile.stage('fill'):
+        futures = {profile.submit(executor, fill_one_file, file, csv_file, directory_path, tuition_filter_list,
+                               include_empty): file
+                   for file in list_of_files}
+        for done, future in enumerate(progress_bar(as_completed(futures), total=len(futures), desc="Filling CSV files", unit="file"), 1):
+            try:
+                future.result()  # Check for exceptions
+            except Exception as e:
+                print(f"Error processing file {futures[future]}: {e}")
+            if progress:
+                # Every task reads the whole input, so report how much of the total work is done.
+                progress(0, total_bytes * done // len(futures), total_bytes, done)
+    return directory_path
+
+
+def write_course_rows(rows, directory_path, desired_columns, output_files, max_open_files=MAX_OPEN_FILES,
+                      include_empty=False, output_format='csv', compress=False, sheets_by='course'):
+    """Stream (course_name, output_row) pairs into one roster file per course."""
+    date = get_current_datetime('%m-%d')
+    empty_courses = []
+    with open_writer_pool(directory_path, max_open_files, output_format, compress, sheets_by) as pool:
+        for course_name, output_row in rows:
+            if output_row is None:
+                empty_courses.append(course_name)
+                continue
+            output_file = output_files.get(course_name)
+            if output_file is None:
+                output_file = output_files[course_name] = get_output_path(directory_path, course_name, date)
+                write_roster_header(pool, output_file, course_name, desired_columns)
+            pool.writerow(output_file, output_row)
+
+        if include_empty:
+            for course_name in empty_courses:
+                if course_name not in output_files:
+                    output_file = get_output_path(directory_path, course_name, date)
+                    write_roster_header(pool, output_file, course_name, desired_columns)
+
+
+def run_single_pass(csv_file, output_dir, tuition_filter_list, max_open_files=MAX_OPEN_FILES, include_empty=False,
+                    progress=None, cache_dir=None, profile=NULL_PROFILE, output_format='csv', compress=False, sheets_by='course',
+                    parquet_dir=None, partition_by='course'):
+    """Read the input (CSV or XLSX) once and stream each row straight into its course's roster file."""
+    directory_path = make_dir(output_dir, create=output_format == 'csv')
+    total_bytes = get_input_size(csv_file)
+    output_files = {}
+
+    try:
+        if cache_dir:
+            with profile.stage('load_roster'):
+                roster = get_cached_roster(csv_file, cache_dir, progress)
+            profile.counters['rows_in'] += len(roster['rows']['course'])
+            rows = profile.time_iter('partition', iter_roster_rows(roster, tuition_filter_list, profile.counters))
+            desired_columns = get_output_columns(roster['bosp_col_exists'])
+            # Writing is charged the streaming loop's time, less the partitioning it drives.
+            with profile.stage('write'), open_parquet_export(parquet_dir, desired_columns, partition_by) as export:
+                write_course_rows(export.tee(rows) if export else rows, directory_path, desired_columns, output_files,
+                                  max_open_files, include_empty, output_format, compress, sheets_by)
+            if progress:
+                progress(len(roster['rows']['course']), total_bytes, total_bytes, len(output_files))
+            return get_output_target(directory_path, output_format)
+
+        roster_input, reader, tell = open_roster(csv_file)
+        with roster_input:
+            getters = get_row_getters(next(reader, []))
+            # Reading covers decoding and CSV (or XLSX) parsing; partitioning covers filtering,
+            # name splitting and deduplication; writing is what is left of the streaming loop.
+            reader = profile.time_iter('read', reader, count='rows_in')
+            if progress:
+                reader = iter_rows_with_progress(reader, tell, total_bytes, progress, output_files)
+            rows = iter_partitioned_rows(reader, getters, tuition_filter_list, profile.counters)
+            rows = profile.time_iter('partition', rows)
+            if total_bytes >= PROGRESS_BAR_MIN_BYTES:
+                rows = progress_bar(rows, desc="Partitioning rows", unit="row")
+            desired_columns = get_output_columns(getters[2])
+            with profile.stage('write'), open_parquet_export(parquet_dir, desired_columns, partition_by) as export:
+                write_course_rows(export.tee(rows) if export else rows, directory_path, desired_columns, output_files,
+                                  max_open_files, include_empty, output_format, compress, sheets_by)
     except Exception as e:
-        print(f"Error creating tree: {e}")
+        print(f"Error partitioning rows: {e}")
         raise
+    return get_output_target(directory_path, output_format)
 
 
-def get_filtered_rows(course_name, reader, tuition_filter_list, bosp_col_exists):
-    """Get filtered rows for a specific course."""
-    seen = set()
-    filtered_rows = []
+def run_chunked(csv_file, output_dir, tuition_filter_list, max_open_files=MAX_OPEN_FILES, workers=None,
+                include_empty=False, start_method=None, progress=None, executor=None, profile=NULL_PROFILE, output_format='csv',
+                compress=False, sheets_by='course', parquet_dir=None, partition_by='course'):
+    """Parse byte-range chunks of the input in parallel, then merge and write the partitions."""
+    from concurrent.futures import as_completed
 
-    bosp_filter = 'BOSP' in tuition_filter_list
-    if bosp_filter:
-        tuition_filter_list.remove('BOSP')
-
-    filter_on = bool(tuition_filter_list)
-
-    if bosp_col_exists:
-
-        for row in reader:
-            if row['Course Offering Subject-Num Desc'] == course_name:
-                write_row = False
-                if filter_on and row["Tuition Group Desc"] in tuition_filter_list:
-                    write_row = True
-                elif bosp_filter and row['Study Agreement Code'][0] in ['O', 'X']:
-                    write_row = True
-                elif not filter_on and not bosp_filter:
-                    write_row = True
-
-                if write_row:
-                    last_name, first_name = row['Last First Name'].split(',', 1)
-                    bosp = 'BOSP' if row['Study Agreement Code'][0] in ['O', 'X'] else ''
-                    output_row = {
-                        'Course Offering Subject-Num Desc': row['Course Offering Subject-Num Desc'],
-                        'EMPLID': row['EMPLID'],
-                        'Preferred Email Address': row['Preferred Email Address'],
-                        'Last Name': last_name,
-                        'First Name': first_name.strip(),
-                        'SUNet ID': row['SUNet ID'],
-                        'Tuition Group Desc': row['Tuition Group Desc'],
-                        'Stu Current Acad Plan Code': row['Stu Current Acad Plan Code'],
-                        'Study Agreement Code': bosp
-                    }
-                    compare_row = (
-                        row['Course Offering Subject-Num Desc'],
-                        row['EMPLID'],
-                        row['Preferred Email Address'],
-                        last_name,
-                        first_name.strip(),
-                        row['SUNet ID']
-                    )
-                    if compare_row not in seen:
-                        filtered_rows.append(output_row)
-                        seen.add(compare_row)
-    
-    else:
-        for row in reader:
-            if row['Course Offering Subject-Num Desc'] == course_name:
-                write_row = False
-                if filter_on and row["Tuition Group Desc"] in tuition_filter_list:
-                    write_row = True
-                elif not filter_on and not bosp_filter:
-                    write_row = True
-                if write_row:
-                    last_name, first_name = row['Last First Name'].split(',', 1)
-                    output_row = {
-                        'Course Offering Subject-Num Desc': row['Course Offering Subject-Num Desc'],
-                        'EMPLID': row['EMPLID'],
-                        'Preferred Email Address': row['Preferred Email Address'],
-                        'Last Name': last_name,
-                        'First Name': first_name.strip(),
-                        'SUNet ID': row['SUNet ID'],
-                        'Tuition Group Desc': row['Tuition Group Desc'],
-                        'Stu Current Acad Plan Code': row['Stu Current Acad Plan Code']
-                    }
-                    compare_row = (
-                        row['Course Offering Subject-Num Desc'],
-                        row['EMPLID'],
-                        row['Preferred Email Address'],
-                        last_name,
-                        first_name.strip(),
-                        row['SUNet ID']
-                    )
-                    if compare_row not in seen:
-                        filtered_rows.append(output_row)
-                        seen.add(compare_row)
-
-    return filtered_rows
-
-
-def fill_one_file(course_name, input_file, directory_path, tuition_filter_list):
-    """Fill a single class file with filtered student data from the input CSV."""
+    directory_path = make_dir(output_dir, create=output_format == 'csv')
+    workers = workers or os.cpu_count() or 1
+
+    try:
+        with profile.stage('boundaries'):
+            header_end, boundaries = find_record_boundaries(csv_file, workers)
+        with open(csv_file, 'rb') as f:
+            header_text = f.read(header_end)
+        header = next(csv.reader(io.TextIOWrapper(io.BytesIO(header_text))), [])
+        getters = get_row_getters(header)
+
+        chunks = list(zip([header_end] + boundaries[:-1], boundaries))
+        with worker_pool(executor, workers, start_method) as executor, profile.stage('parse'):
+            # Map each future to the size of its chunk, in input order.
+            futures = {profile.submit(executor, partition_chunk, csv_file, start, end, header, tuition_filter_list): end - start
+                       for start, end in chunks if end > start}
+            rows_parsed = bytes_read = 0
+            for future in progress_bar(as_completed(futures), total=len(futures), desc="Parsing chunks", unit="chunk"):
+                rows_parsed += future.result()[1]
+                bytes_read += futures[future]
+                if progress:
+                    progress(rows_parsed, bytes_read, boundaries[-1], 0)
+        with profile.stage('merge'):
+            partitions = merge_partitions(future.result()[0] for future in futures)
+    except Exception as e:
+        print(f"Error partitioning chunks: {e}")
+        raise
+
+    profile.counters.update(rows_in=rows_parsed, rows_out=sum(len(rows) for rows in partitions.values()))
+    with profile.stage('write'):
+        write_partitions(partitions, directory_path, getters[2], max_open_files, include_empty, output_format, compress,
+                         sheets_by)
+    with profile.stage('parquet'):
+        export_partitions(partitions, parquet_dir, getters[2], partition_by)
+    if progress:
+        progress(rows_parsed, boundaries[-1], boundaries[-1], sum(1 for rows in partitions.values() if rows or include_empty))
+    return get_output_target(directory_path, output_format)
+
+
+def run_shared_memory(csv_file, output_dir, tuition_filter_list, max_open_files=MAX_OPEN_FILES, workers=None,
+                      include_empty=False, start_method=None, progress=None, executor=None, profile=NULL_PROFILE):
+    """Parse the input once, share it with workers through shared memory and let each write a shard of courses."""
+    from concurrent.futures import as_completed
+
+    directory_path = make_dir(output_dir)
+    workers = workers or os.cpu_count() or 1
+
+    with profile.stage('load'):
+        blocks, layout = load_shared_roster(csv_file, workers)
+    total_bytes = os.path.getsize(csv_file)
+    profile.counters['rows_in'] += layout['rows']
+    if progress:
+        progress(layout['rows'], total_bytes, total_bytes, 0)
+    try:
+        with worker_pool(executor, workers, start_method) as executor, profile.stage('fill'):
+            futures = [profile.submit(executor, fill_shared_shard, layout, shard, tuition_filter_list,
+                                   directory_path, max_open_files, include_empty)
+                       for shard in range(workers)]
+            courses_written = 0
+            for future in progress_bar(as_completed(futures), total=len(futures), desc="Filling CSV files", unit="shard"):
+                courses_written += future.result()
+                if progress:
+                    progress(layout['rows'], total_bytes, total_bytes, courses_written)
+    except Exception as e:
+        print(f"Error filling shared roster: {e}")
+        raise
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return directory_path
+
+
+def run_columnar(csv_file, output_dir, tuition_filter_list, include_empty=False, progress=None, profile=NULL_PROFILE):
+    """Load the needed columns with pandas and filter, dedup and group them as whole columns."""
+    import pandas as pd
+
+    directory_path = make_dir(output_dir)
     date = get_current_datetime('%m-%d')
-    output_file = os.path.join(directory_path, f'{course_name.replace(" ", "")} SCPD Roster {date}.csv')
-    reader = csv.DictReader(csv_input)
-
-    bosp_col_exists = False
-    if 'Study Agreement Code' in reader[0]:
-        bosp_col_exists = True
-    
-    if bosp_col_exists:
-        desired_columns = [
-            'Course Offering Subject-Num Desc', 'EMPLID', 'Preferred Email Address',
-            'Last Name', 'First Name', 'SUNet ID', 'Tuition Group Desc',
-            'Stu Current Acad Plan Code', 'Study Agreement Code'
-        ]
-        main_heading_row = {
-            'Course Offering Subject-Num Desc': f'Course: {course_name}',
-            'EMPLID': '', 'Preferred Email Address': '',
-            'Last Name': '', 'First Name': '',
-            'SUNet ID': '', 'Tuition Group Desc': '',
-            'Stu Current Acad Plan Code': '', 'Study Agreement Code': ''
-        }
-    else:
-        desired_columns = [
+
+    tuition_filters = [f for f in tuition_filter_list if f != 'BOSP']
+    bosp_filter = 'BOSP' in tuition_filter_list
+    filter_on = bool(tuition_filters)
+
+    try:
+        input_columns = pd.read_csv(csv_file, nrows=0).columns
+        bosp_col_exists = 'Study Agreement Code' in input_columns
+        usecols = [
             'Course Offering Subject-Num Desc', 'EMPLID', 'Preferred Email Address',
-            'Last Name', 'First Name', 'SUNet ID', 'Tuition Group Desc',
-            'Stu Current Acad Plan Code'
+            'Last First Name', 'SUNet ID', 'Tuition Group Desc', 'Stu Current Acad Plan Code'
         ]
-        main_heading_row = {
-            'Course Offering Subject-Num Desc': f'Course: {course_name}',
-            'EMPLID': '', 'Preferred Email Address': '',
-            'Last Name': '', 'First Name': '',
-            'SUNet ID': '', 'Tuition Group Desc': '',
-            'Stu Current Acad Plan Code': ''
-        }
+        if bosp_col_exists:
+            usecols.append('Study Agreement Code')
+        with profile.stage('read'):
+            df = pd.read_csv(csv_file, usecols=usecols, dtype=str, keep_default_na=False)
+        with profile.stage('partition'):
+            courses = df['Course Offering Subject-Num Desc'].unique()
+            rows_parsed = len(df)
+            total_bytes = os.path.getsize(csv_file)
+            if progress:
+                progress(rows_parsed, total_bytes, total_bytes, 0)
+
+            if bosp_col_exists:
+                is_bosp = df['Study Agreement Code'].str[:1].isin(BOSP_AGREEMENT_PREFIXES)
+            else:
+                is_bosp = pd.Series(False, index=df.index)
+
+            if not filter_on and not bosp_filter:
+                mask = pd.Series(True, index=df.index)
+            else:
+                mask = df['Tuition Group Desc'].isin(tuition_filters) if filter_on else pd.Series(False, index=df.index)
+                if bosp_filter:
+                    mask |= is_bosp
+            df = df[mask]
+            is_bosp = is_bosp[mask]
 
+            names = df['Last First Name'].str.split(',', n=1, expand=True)
+            if len(df) and (names.shape[1] < 2 or names[1].isna().any()):
+                # Name the first roster row whose name has no comma; df keeps the row numbers read_csv gave it
+                row_index = df.index[0] if names.shape[1] < 2 else names.index[names[1].isna()][0]
+                row = df.loc[row_index]
+                raise ValueError(f"{csv_file} row {row_index + 1} ({row['Course Offering Subject-Num Desc']}): "
+                                 f"'Last First Name' {row['Last First Name']!r} has no comma")
+
+            desired_columns = get_output_columns(bosp_col_exists)
+            out = pd.DataFrame({
+                'Course Offering Subject-Num Desc': df['Course Offering Subject-Num Desc'],
+                'EMPLID': df['EMPLID'],
+                'Preferred Email Address': df['Preferred Email Address'],
+                'Last Name': names[0] if len(df) else '',
+                'First Name': names[1].str.strip() if len(df) else '',
+                'SUNet ID': df['SUNet ID'],
+                'Tuition Group Desc': df['Tuition Group Desc'],
+                'Stu Current Acad Plan Code': df['Stu Current Acad Plan Code'],
+            }, index=df.index)
+            if bosp_col_exists:
+                out['Study Agreement Code'] = is_bosp.map({True: 'BOSP', False: ''})
+            out = out.drop_duplicates(subset=[
+                'Course Offering Subject-Num Desc', 'EMPLID', 'Preferred Email Address',
+                'Last Name', 'First Name', 'SUNet ID'
+            ])
+
+            groups = dict(tuple(out.groupby('Course Offering Subject-Num Desc', sort=False)))
+        profile.counters.update(rows_in=rows_parsed, rows_filtered=rows_parsed - len(df),
+                                rows_duplicate=len(df) - len(out), rows_out=len(out))
+        courses_written = 0
+        with profile.stage('write'):
+            for course_name in progress_bar(courses, total=len(courses), desc="Filling CSV files", unit="file"):
+                group = groups.get(course_name)
+                if group is None and not include_empty:
+                    continue
+                courses_written += 1
+                output_file = get_output_path(directory_path, course_name, date)
+                with RosterWriter(output_file) as writer:
+                    heading_row = get_heading_row(course_name, desired_columns)
+                    writer.writerow([heading_row[column] for column in desired_columns])
+                    writer.writerow(desired_columns)
+                    if group is not None:
+                        writer.writerows(group.itertuples(index=False, name=None))
+        if progress:
+            progress(rows_parsed, total_bytes, total_bytes, courses_written)
+    except Exception as e:
+        print(f"Error computing columnar partitions: {e}")
+        raise
+    return directory_path
+
+
+def run_indexed(csv_file, output_dir, tuition_filter_list, max_open_files=MAX_OPEN_FILES, include_empty=False,
+                progress=None, cache_dir=None, profile=NULL_PROFILE, output_format='csv', compress=False, sheets_by='course',
+                parquet_dir=None, partition_by='course', index_path=None):
+    """Load the input into a SQLite roster index and export each course's roster with an indexed query."""
+    import contextlib
+
+    directory_path = make_dir(output_dir, create=output_format == 'csv')
+    total_bytes = get_input_size(csv_file)
+    output_files = {}
 
     try:
-        with open(input_file, 'r') as csv_input, open(output_file, 'w', newline='') as csv_output:
-            reader = csv.DictReader(csv_input)
-            writer = csv.DictWriter(csv_output, fieldnames=desired_columns)
-            writer.writerow(main_heading_row)
-            writer.writeheader()
+        with contextlib.ExitStack() as stack:
+            with profile.stage('index'):
+                index_path = stack.enter_context(open_roster_index(csv_file, index_path, cache_dir, progress))
+            connection = connect_roster_index(index_path)
+            stack.callback(connection.close)
+            meta = dict(connection.execute('SELECT key, value FROM meta'))
+            bosp_col_exists = meta['bosp_col_exists'] == '1'
+            rows_in = connection.execute('SELECT COUNT(*) FROM roster').fetchone()[0]
+            profile.counters['rows_in'] += rows_in
+            rows = iter_index_rows_by_course(connection, tuition_filter_list, bosp_col_exists, profile.counters)
+            rows = profile.time_iter('query', rows)
+            desired_columns = get_output_columns(bosp_col_exists)
+            with profile.stage('write'), open_parquet_export(parquet_dir, desired_columns, partition_by) as export:
+                write_course_rows(export.tee(rows) if export else rows, directory_path, desired_columns, output_files,
+                                  max_open_files, include_empty, output_format, compress, sheets_by)
+        if progress:
+            progress(rows_in, total_bytes, total_bytes, len(output_files))
+    except Exception as e:
+        print(f"Error exporting rosters from the roster index: {e}")
+        raise
+    return get_output_target(directory_path, output_format)
+
+
+# compute() options that reach the engines under another name.
+ENGINE_PARAMETERS = {'use_cache': 'cache_dir'}
 
-            filtered_rows = get_filtered_rows(course_name, reader, tuition_filter_list, bosp_col_exists)
-            for row in filtered_rows:
-                writer.writerow(row)
+ENGINES = {
+    'single_pass': run_single_pass,
+    'per_course': run_per_course,
+    'columnar': run_columnar,
+    'chunked': run_chunked,
+    'shared_memory': run_shared_memory,
+    'sqlite': run_indexed,
+}
+# Engines that read the input through open_roster and so also accept .xlsx workbooks and compressed exports.
+# The others split or load the input as CSV bytes.
+XLSX_ENGINES = ['single_pass', 'sqlite']
+# Engines that write every roster from the calling process, and so can write them into one ZIP archive or workbook.
+SINGLE_OUTPUT_ENGINES = ['single_pass', 'chunked', 'sqlite']
+
+
+def resolve_inputs(name_of_file):
+    """Expand paths, glob patterns and ZIP archives into the input files, in a stable order."""
+    import glob
+
+    patterns = [name_of_file] if isinstance(name_of_file, str) else list(name_of_file)
+    input_files = []
+    for pattern in patterns:
+        if os.path.isfile(pattern) or not any(char in pattern for char in '*?['):
+            input_files.append(pattern)
+        else:
+            input_files += sorted(glob.glob(pattern))
+
+    expanded = []
+    for input_file in input_files:
+        if os.path.isfile(input_file) and get_compression(input_file) == 'zip':
+            members = list_zip_rosters(input_file)
+            if not members:
+                raise ValueError(f"{input_file} holds no .csv or .xlsx roster files")
+            expanded += [os.path.join(input_file, member) for member in members]
+        else:
+            expanded.append(input_file)
+    return list(dict.fromkeys(expanded))
+
+
+def partition_input(input_file, tuition_filter_list, cache_dir=None, profile=False):
+    """Partition one of several inputs in a worker process."""
+    rows_parsed = [0]
+
+    def count(rows, *_):
+        rows_parsed[0] = rows
+
+    worker_profile = RunProfile() if profile else NULL_PROFILE
+    partitions, bosp_col_exists = partition_rows(input_file, tuition_filter_list, cache_dir, count, worker_profile)
+    return partitions, bosp_col_exists, rows_parsed[0], worker_profile.counters
+
+
+def partition_inputs(input_files, tuition_filter_list, cache_dir=None, workers=None, start_method=None, progress=None,
+                     executor=None, profile=NULL_PROFILE):
+    """Partition several inputs in parallel and merge them into one set of per-course rows."""
+    from concurrent.futures import as_completed
+
+    if len(input_files) == 1:
+        return partition_rows(input_files[0], tuition_filter_list, cache_dir, progress, profile)
+
+    sizes = [get_input_size(input_file) for input_file in input_files]
+    total_bytes = sum(sizes)
+    workers = min(workers or os.cpu_count() or 1, len(input_files))
+    results = [None] * len(input_files)
+    try:
+        with worker_pool(executor, workers, start_method) as executor, profile.stage('parse'):
+            futures = {profile.submit(executor, partition_input, input_file, tuition_filter_list, cache_dir,
+                                   bool(profile)): index
+                       for index, input_file in enumerate(input_files)}
+            rows_parsed = bytes_read = 0
+            for future in progress_bar(as_completed(futures), total=len(futures), desc="Parsing inputs", unit="file"):
+                index = futures[future]
+                results[index] = future.result()
+                rows_parsed += results[index][2]
+                bytes_read += sizes[index]
+                if progress:
+                    progress(rows_parsed, bytes_read, total_bytes, 0)
+                profile.counters.update(results[index][3])
     except Exception as e:
-        print(f"Error filling file {course_name}: {e}")
+        print(f"Error partitioning inputs: {e}")
         raise
 
+    with profile.stage('merge'):
+        partitions = merge_partitions(result[0] for result in results)
+    bosp_col_exists = any(result[1] for result in results)
+    if bosp_col_exists and not all(result[1] for result in results):
+        for course_name, course_rows in partitions.items():
+            partitions[course_name] = [row if len(row) == 9 else row + ('',) for row in course_rows]
+    return partitions, bosp_col_exists
+
+
+def run_batch(input_files, output_dir, tuition_filter_list, max_open_files=MAX_OPEN_FILES, workers=None,
+              include_empty=False, start_method=None, progress=None, cache_dir=None, executor=None, profile=NULL_PROFILE,
+              output_format='csv', compress=False, sheets_by='course', parquet_dir=None, partition_by='course'):
+    """Merge several inputs into one tree of per-course rosters; see partition_inputs."""
+    directory_path = make_dir(output_dir, create=output_format == 'csv')
+    parsed = [0, 0, 0]
+
+    def report(rows_parsed, bytes_read, total_bytes, courses_written):
+        parsed[:] = [rows_parsed, bytes_read, total_bytes]
+        progress(rows_parsed, bytes_read, total_bytes, courses_written)
+
+    partitions, bosp_col_exists = partition_inputs(input_files, tuition_filter_list, cache_dir, workers, start_method,
+                                                   report if progress else None, executor, profile)
+    profile.counters['rows_out'] = sum(len(course_rows) for course_rows in partitions.values())
+    with profile.stage('write'):
+        write_partitions(partitions, directory_path, bosp_col_exists, max_open_files, include_empty, output_format,
+                         compress, sheets_by)
+    with profile.stage('parquet'):
+        export_partitions(partitions, parquet_dir, bosp_col_exists, partition_by)
+    if progress:
+        courses_written = sum(1 for course_rows in partitions.values() if course_rows or include_empty)
+        progress(parsed[0], parsed[2], parsed[2], courses_written)
+    return get_output_target(directory_path, output_format)
+
+
+# Records, inside a folder updated with incremental=True, what the last run wrote there.
+SNAPSHOT_FILE = '.roster_snapshot'
+# Bump when the snapshot layout changes; an unknown snapshot makes the next run rewrite everything.
+SNAPSHOT_VERSION = 1
+# Columns of the added/dropped report written by update_rosters.
+CHANGE_REPORT_COLUMNS = [
+    'Course Offering Subject-Num Desc', 'Change', 'EMPLID', 'Preferred Email Address', 'Last Name', 'First Name',
+    'SUNet ID'
+]
+
+def load_snapshot(directory_path):
+    """Return the per-course snapshot of the last incremental run into directory_path, or {} if there is none."""
+    import marshal
+
+    try:
+        with open(os.path.join(directory_path, SNAPSHOT_FILE), 'rb') as f:
+            snapshot = marshal.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, EOFError, ValueError, TypeError) as e:
+        print(f"Ignoring unreadable snapshot in {directory_path}: {e}")
+        return {}
+    if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+        return {}
+    return snapshot['courses']
 
 
-def compute(name_of_file, output_dir, tuition_filter_list):
+def get_roster_digest(desired_columns, course_rows):
+    """Fingerprint the columns and rows of a roster file, which is everything in it but the date."""
+    import hashlib
+
+    digest = hashlib.blake2b('\x1f'.join(desired_columns).encode('utf-8', 'surrogatepass'), digest_size=16)
+    for row in course_rows:
+        digest.update(('\x1e' + '\x1f'.join(row)).encode('utf-8', 'surrogatepass'))
+    return digest.digest()
+
+
+def get_member_key(output_row):
+    """Return the identity of a student on a roster: the compare_row fields after the course."""
+    return '\x1f'.join(output_row[1:6])
+
+
+def update_rosters(csv_file, directory_path, tuition_filter_list, max_open_files=MAX_OPEN_FILES, include_empty=False,
+                   progress=None, cache_dir=None, workers=None, start_method=None, executor=None, profile=NULL_PROFILE,
+                   parquet_dir=None, partition_by='course'):
+    """Bring the rosters in directory_path up to date with csv_file, rewriting only the courses that changed."""
+    import marshal
+
+    os.makedirs(directory_path, exist_ok=True)
+    previous = load_snapshot(directory_path)
+    input_files = [csv_file] if isinstance(csv_file, str) else csv_file
+    partitions, bosp_col_exists = partition_inputs(input_files, tuition_filter_list, cache_dir, workers, start_method,
+                                                   progress, executor, profile)
+    profile.counters['rows_out'] = sum(len(course_rows) for course_rows in partitions.values())
+    desired_columns = get_output_columns(bosp_col_exists)
+    date = get_current_datetime('%m-%d')
+
+    courses = {}
+    report = []
+    stale_files = []
+    rewritten = 0
+    try:
+        with profile.stage('update'), WriterPool(max_open_files) as pool:
+            for course_name in list(partitions) + [name for name in previous if name not in partitions]:
+                course_rows = partitions.get(course_name)
+                old = previous.get(course_name)
+                if course_rows or (course_rows is not None and include_empty):
+                    entry = {
+                        'file': old['file'] if old else None,
+                        'digest': get_roster_digest(desired_columns, course_rows),
+                        'members': [get_member_key(row) for row in course_rows],
+                    }
+                    if not (old and old['digest'] == entry['digest']
+                            and os.path.exists(os.path.join(directory_path, old['file']))):
+                        output_file = get_output_path(directory_path, course_name, date)
+                        entry['file'] = os.path.basename(output_file)
+                        write_roster_header(pool, output_file, course_name, desired_columns)
+                        pool.writerows(output_file, course_rows)
+                        rewritten += 1
+                    courses[course_name] = entry
+                else:
+                    entry = None
+
+                if old is None:
+                    old_members = []
+                else:
+                    old_members = old['members']
+                    old_file = os.path.join(directory_path, old['file'])
+                    if entry is None or entry['file'] != old['file']:
+                        stale_files.append(old_file)
+                new_members = entry['members'] if entry else []
+                if new_members != old_members:
+                    old_set, new_set = set(old_members), set(new_members)
+                    report += [[course_name, 'added'] + key.split('\x1f') for key in new_members if key not in old_set]
+                    report += [[course_name, 'dropped'] + key.split('\x1f') for key in old_members if key not in new_set]
+
+        # Superseded rosters are only removed once their replacements are committed and recorded, so a
+        # failed run leaves every course with its old roster or its new one.
+        write_file_atomically(os.path.join(directory_path, SNAPSHOT_FILE),
+                              marshal.dumps({'version': SNAPSHOT_VERSION, 'courses': courses}))
+        for old_file in stale_files:
+            if os.path.exists(old_file):
+                os.remove(old_file)
+        if report:
+            report_file = os.path.join(directory_path, f'Roster Changes {get_current_datetime("%m-%d %H%M%S")}.csv')
+            # Encoded as open() would, like the rosters themselves.
+            stream = io.TextIOWrapper(io.BytesIO(), newline='')
+            writer = csv.writer(stream)
+            writer.writerow(CHANGE_REPORT_COLUMNS)
+            writer.writerows(report)
+            stream.flush()
+            write_file_atomically(report_file, stream.buffer.getvalue())
+    except Exception as e:
+        print(f"Error updating rosters: {e}")
+        raise
+
+    with profile.stage('parquet'):
+        export_partitions(partitions, parquet_dir, bosp_col_exists, partition_by)
+    print(f'Rewrote {rewritten} of {len(courses)} rosters; {len(report)} students added or dropped')
+    return directory_path, rewritten, len(report)
+
+
+def compute(name_of_file, output_dir, tuition_filter_list, engine='single_pass', max_open_files=MAX_OPEN_FILES, workers=None,
+            include_empty=False, start_method=None, progress=None, use_cache=False, cache_dir=None, incremental=False,
+            executor=None, profile=NULL_PROFILE, output_format='csv', compress=False, sheets_by='course', parquet_dir=None,
+            partition_by='course', index_path=None):
     """Main computation function to create and fill class files based on input and filters."""
     if not name_of_file:
         sys.exit("ERROR: Filename not provided.")
-    
-    csv_file = f"{name_of_file}"
-    if not os.path.isfile(csv_file):
-        sys.exit(f"ERROR: File {csv_file} not found in directory.")
 
+    input_files = resolve_inputs(name_of_file)
+    if not input_files:
+        patterns = name_of_file if isinstance(name_of_file, str) else ', '.join(name_of_file)
+        sys.exit(f"ERROR: No files match {patterns}.")
+    for csv_file in input_files:
+        if not os.path.isfile(split_zip_member(csv_file)[0]):
+            sys.exit(f"ERROR: File {csv_file} not found in directory.")
+
+    if engine not in ENGINES:
+        sys.exit(f"ERROR: Unknown engine {engine}. Choose from: {', '.join(ENGINES)}")
+    for csv_file in input_files:
+        if (is_xlsx(csv_file) or is_compressed(csv_file)) and engine not in XLSX_ENGINES:
+            sys.exit(f"ERROR: The {engine} engine only reads uncompressed CSV. "
+                     f"Use {' or '.join(XLSX_ENGINES)} for {csv_file}.")
+    if incremental and engine != 'single_pass':
+        sys.exit(f"ERROR: Incremental updates use the single_pass engine, not {engine}.")
+    if len(input_files) > 1 and engine != 'single_pass':
+        sys.exit(f"ERROR: Several inputs are merged with the single_pass engine, not {engine}.")
+    if output_format not in OUTPUT_FORMATS:
+        sys.exit(f"ERROR: Unknown output format {output_format}. Choose from: {', '.join(OUTPUT_FORMATS)}")
+    if output_format != 'csv' and (incremental or engine not in SINGLE_OUTPUT_ENGINES):
+        sys.exit(f"ERROR: {output_format.upper()} output is written by the {' or '.join(SINGLE_OUTPUT_ENGINES)} "
+                 "engine, without incremental updates.")
+    if parquet_dir is not None:
+        if engine not in SINGLE_OUTPUT_ENGINES:
+            sys.exit(f"ERROR: Parquet export is written by the {' or '.join(SINGLE_OUTPUT_ENGINES)} engine, not {engine}.")
+        import importlib.util
+
+        if importlib.util.find_spec('pyarrow') is None:
+            sys.exit("ERROR: Parquet export needs pyarrow. Install it with: pip install pyarrow")
+    for grouping in (sheets_by, partition_by):
+        if grouping not in ROSTER_GROUPINGS:
+            sys.exit(f"ERROR: Unknown grouping {grouping}. Choose from: {', '.join(ROSTER_GROUPINGS)}")
+
+    import inspect
+
+    run = update_rosters if incremental else run_batch if len(input_files) > 1 else ENGINES[engine]
+    accepted = inspect.signature(run).parameters
+    defaults = inspect.signature(compute).parameters
+    options = {'max_open_files': max_open_files, 'workers': workers, 'start_method': start_method,
+               'use_cache': use_cache, 'compress': compress, 'sheets_by': sheets_by, 'partition_by': partition_by,
+               'index_path': index_path}
+    # An option the chosen engine would not use is an error rather than silently dropped.
+    ignored = [name for name, value in options.items()
+               if value != defaults[name].default and ENGINE_PARAMETERS.get(name, name) not in accepted]
+    if ignored:
+        mode = 'incremental updates' if incremental else 'several inputs' if len(input_files) > 1 else f'the {engine} engine'
+        sys.exit(f"ERROR: {', '.join(ignored)} cannot be used with {mode}.")
+
+    profile = profile or NULL_PROFILE
     try:
-        print(f'Operating on file {csv_file}')
+        if len(input_files) == 1:
+            print(f'Operating on file {input_files[0]}')
+        else:
+            print(f'Operating on {len(input_files)} files: {", ".join(input_files)}')
         print(f'Filtering by: {tuition_filter_list}')
-        directory_path, list_of_files = make_tree(csv_file, output_dir)
-
-        # Use ProcessPoolExecutor to fill files concurrently
-        with ProcessPoolExecutor() as executor:
-            futures = {executor.submit(fill_one_file, file, csv_file, directory_path, tuition_filter_list): file for file in list_of_files}
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Filling CSV files", unit="file"):
-                try:
-                    future.result()  # Check for exceptions
-                except Exception as e:
-                    print(f"Error processing file {futures[future]}: {e}")
+        if use_cache:
+            cache_dir = cache_dir or get_cache_dir()
+        else:
+            cache_dir = None
+        engine_options = {'max_open_files': max_open_files, 'workers': workers, 'include_empty': include_empty,
+                          'start_method': start_method, 'progress': progress, 'cache_dir': cache_dir,
+                          'executor': executor, 'profile': profile, 'output_format': output_format,
+                          'compress': compress, 'sheets_by': sheets_by, 'parquet_dir': parquet_dir,
+                          'partition_by': partition_by, 'index_path': index_path}
+        engine_options = {name: value for name, value in engine_options.items() if name in accepted}
+        if incremental:
+            directory_path, rewritten, _ = update_rosters(input_files, output_dir, list(tuition_filter_list),
+                                                          **engine_options)
+        else:
+            directory_path = run(input_files if len(input_files) > 1 else input_files[0], output_dir,
+                                 list(tuition_filter_list), **engine_options)
+        if profile:
+            add_output_totals(profile, input_files, directory_path, rewritten if incremental else None)
 
         print("\nComplete!")
+        return directory_path
     except Exception as e:
         print(f"Error during computation: {e}")
         raise
 
+def add_output_totals(profile, input_files, directory_path, files_written=None):
+    """Add the bytes read, files and bytes written and rows out of a finished run to profile's counters."""
+    counters = profile.counters
+    counters['bytes_read'] += sum(get_input_size(input_file) for input_file in input_files)
+    if directory_path.endswith('.xlsx'):
+        counters.update(files_written=1, bytes_written=os.path.getsize(directory_path))
+    elif os.path.isfile(directory_path):
+        import zipfile
+
+        with zipfile.ZipFile(directory_path) as archive:
+            counters['files_written'] += len(archive.infolist())
+        counters['bytes_written'] += os.path.getsize(directory_path)
+    elif files_written is None:
+        with os.scandir(directory_path) as entries:
+            sizes = [entry.stat().st_size for entry in entries if entry.is_file() and entry.name.endswith('.csv')]
+        counters.update(files_written=len(sizes), bytes_written=sum(sizes))
+    else:
+        counters['files_written'] += files_written
+    if 'rows_out' not in counters and 'rows_in' in counters and 'rows_filtered' in counters:
+        counters['rows_out'] = (counters['rows_in'] - counters['rows_blank'] - counters['rows_filtered']
+                                - counters['rows_duplicate'])
+
+# Extensions of compressed exports picked up by a watched folder; their format is still detected from their contents.
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zip')
+# Seconds between two scans of a watched folder.
+WATCH_INTERVAL = 2.0
+# Seconds a file's size and mtime must stay unchanged before it counts as fully copied into a watched folder.
+WATCH_SETTLE_SECONDS = 5.0
+
+def is_roster_file(name):
+    """Return whether a file in a watched folder is a roster export rather than a partial or hidden file."""
+    return name.lower().endswith(ROSTER_EXTENSIONS + COMPRESSED_EXTENSIONS) and not name.startswith(('.', '~$'))
+
+
+def find_settled_files(input_dir, seen, settle=WATCH_SETTLE_SECONDS, now=None):
+    """Return the roster files in input_dir whose size and mtime have not changed for settle seconds."""
+    now = time.monotonic() if now is None else now
+    settled = []
+    current = {}
+    for entry in os.scandir(input_dir):
+        if not entry.is_file() or not is_roster_file(entry.name):
+            continue
+        stat = entry.stat()
+        signature = (stat.st_size, stat.st_mtime_ns)
+        previous = seen.get(entry.path)
+        since = previous[1] if previous and previous[0] == signature else now
+        current[entry.path] = (signature, since)
+        if stat.st_size and now - since >= settle:
+            settled.append(entry.path)
+    seen.clear()
+    seen.update(current)
+    return sorted(settled)
+
+
+def get_export_stem(path):
+    """Return a roster export's file name without its extensions, e.g. 'r' for 'r.csv.gz'."""
+    name = os.path.basename(path)
+    if name.lower().endswith(COMPRESSED_EXTENSIONS):
+        name = os.path.splitext(name)[0]
+    return os.path.splitext(name)[0]
+
+
+def move_into(path, directory):
+    """Move a file into directory, adding a timestamp to its name if one with that name is already there."""
+    os.makedirs(directory, exist_ok=True)
+    destination = os.path.join(directory, os.path.basename(path))
+    if os.path.exists(destination):
+        stem, extension = os.path.splitext(os.path.basename(path))
+        destination = os.path.join(directory, f'{stem} {get_current_datetime("%m-%d %H%M%S")}{extension}')
+    os.replace(path, destination)
+    return destination
+
+
+def watch_folder(input_dir, output_dir, tuition_filter_list, interval=WATCH_INTERVAL, settle=WATCH_SETTLE_SECONDS,
+                 max_files=None, **options):
+    """Process every roster export that lands in input_dir, until interrupted."""
+    processed_dir = os.path.join(input_dir, 'processed')
+    failed_dir = os.path.join(input_dir, 'failed')
+    seen = {}
+    handled = 0
+    print(f'Watching {input_dir} for roster exports; press Ctrl+C to stop.')
+    # workers and start_method size the watch's own pool, which compute() is given instead.
+    workers = options.pop('workers', None)
+    start_method = options.pop('start_method', None)
+    try:
+        with worker_pool(None, workers, start_method) as executor:
+            while max_files is None or handled < max_files:
+                for input_file in find_settled_files(input_dir, seen, settle):
+                    stem = get_export_stem(input_file)
+                    try:
+                        compute(input_file, os.path.join(output_dir, stem), tuition_filter_list, executor=executor,
+                                **options)
+                        destination = processed_dir
+                    except (Exception, SystemExit) as e:
+                        print(f"Error processing {input_file}: {e}")
+                        destination = failed_dir
+                    print(f'Moved {input_file} to {move_into(input_file, destination)}')
+                    seen.pop(input_file, None)
+                    handled += 1
+                    if max_files is not None and handled >= max_files:
+                        break
+                else:
+                    time.sleep(interval)
+    except KeyboardInterrupt:
+        print('Stopped watching.')
+    return handled
+
+
 def main():
     """Entry point for the script."""
-    if len(sys.argv) < 3:
-        print("No Arguments")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Split a roster CSV or XLSX into one roster file per course.")
+    parser.add_argument('input_file', help="Roster CSV or XLSX exported from the registrar, or a quoted glob "
+                                           "pattern such as 'exports/*.csv' to merge several")
+    parser.add_argument('output_dir', nargs='?',
+                        help="Directory the Classes_<timestamp> folder is created in (not used by --lookup and "
+                             "--count, which take every argument after input_file as a filter)")
+    parser.add_argument('filters', nargs='*', help="Tuition Group Desc values to keep, and/or BOSP")
+    parser.add_argument('--engine', choices=list(ENGINES), default='single_pass',
+                        help="How to partition the roster (default: single_pass)")
+    parser.add_argument('--max-open-files', type=int, default=MAX_OPEN_FILES,
+                        help=f"Roster files kept open at once (default: {MAX_OPEN_FILES})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for the per_course, chunked and shared_memory engines and for parsing "
+                             "several inputs (default: CPU count)")
+    parser.add_argument('--start-method', choices=START_METHODS, default=None,
+                        help="Process start method for the worker pools (default: platform default)")
+    parser.add_argument('--include-empty', action='store_true',
+                        help="Also write header-only rosters for courses with no rows after filtering")
+    parser.add_argument('--input', action='append', default=[], metavar='FILE',
+                        help="Another roster to merge into the same output; may be repeated")
+    parser.add_argument('--cache', action='store_true',
+                        help="Cache the parsed roster, student names and IDs included, in the per-user cache "
+                             "directory, so re-running the same export with other filters skips parsing")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Keep the rosters directly in output_dir and only rewrite the courses that changed "
+                             "since the last --incremental run, with an added/dropped report")
+    parser.add_argument('--watch', action='store_true',
+                        help="Treat input_file as a drop folder and process each roster that lands in it, until stopped")
+    parser.add_argument('--settle-seconds', type=float, default=WATCH_SETTLE_SECONDS,
+                        help=f"With --watch, how long a file must stay unchanged before it is read (default: {WATCH_SETTLE_SECONDS:g})")
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='csv',
+                        help="Write one CSV per course into a folder, the same CSVs into one ZIP archive, which is "
+                             "much faster on network shares, or one Excel workbook with a sheet per course (default: csv)")
+    parser.add_argument('--deflate', action='store_true', help="With --output-format zip, compress the archive")
+    parser.add_argument('--sheets-by', choices=ROSTER_GROUPINGS, default='course',
+                        help="With --output-format xlsx, give each course or each department its own sheet "
+                             "(default: course)")
+    parser.add_argument('--parquet', metavar='DIR',
+                        help="Also write the filtered rows to DIR as a Hive-partitioned Parquet dataset, replacing "
+                             "the one there (needs pyarrow)")
+    parser.add_argument('--partition-by', choices=ROSTER_GROUPINGS, default='course',
+                        help="With --parquet, partition the dataset by course or by department (default: course)")
+    parser.add_argument('--index-db', metavar='FILE.sqlite',
+                        help="SQLite roster index kept for --engine sqlite, --lookup and --count (default: "
+                             f"{ROSTER_INDEX_FILE} in the cache directory with --cache, else a temporary index)")
+    parser.add_argument('--lookup', metavar='ID',
+                        help="Print the courses of the student with this EMPLID or SUNet ID from the roster index, "
+                             "loading input_file into it first if needed, instead of writing rosters")
+    parser.add_argument('--count', metavar='COURSE',
+                        help="Print how many students the filtered roster of this course has, from the roster index, "
+                             "instead of writing rosters")
+    parser.add_argument('--profile', metavar='REPORT.json',
+                        help="Write per-stage timings, row and byte counts and per-worker peak memory to this JSON file")
+    parser.add_argument('--cprofile', metavar='FILE.prof',
+                        help="Also run the computation under cProfile and dump the stats to this file")
+    # Filters may follow options, as in: r.csv --count "CS 100A" "SCPD NDO".
+    args = parser.parse_intermixed_args()
+    if args.deflate and args.output_format != 'zip':
+        parser.error("--deflate only applies to --output-format zip")
+    if args.sheets_by != 'course' and args.output_format != 'xlsx':
+        parser.error("--sheets-by only applies to --output-format xlsx")
+    if args.partition_by != 'course' and not args.parquet:
+        parser.error("--partition-by only applies to --parquet")
+    if args.lookup or args.count:
+        filters = ([args.output_dir] if args.output_dir else []) + args.filters
+    elif args.output_dir is None:
+        parser.error("the following arguments are required: output_dir")
+    if args.watch:
+        if args.input or args.incremental or args.profile or args.cprofile or args.parquet or args.lookup or args.count:
+            parser.error("--watch cannot be combined with --input, --incremental, --profile, --cprofile, --parquet, "
+                         "--lookup or --count")
+        watch_folder(args.input_file, args.output_dir, args.filters, settle=args.settle_seconds, engine=args.engine,
+                     max_open_files=args.max_open_files, workers=args.workers, include_empty=args.include_empty,
+                     start_method=args.start_method, use_cache=args.cache, output_format=args.output_format,
+                     compress=args.deflate, sheets_by=args.sheets_by, index_path=args.index_db)
         return
-    name_of_file = sys.argv[1]
-    output_dir = sys.argv[2]
-    filters = sys.argv[3:]
-    compute(name_of_file, output_dir, filters)
+    if args.lookup or args.count:
+        if args.input or args.incremental:
+            parser.error("--lookup and --count query a single input and cannot be combined with --input or --incremental")
+        if not os.path.isfile(split_zip_member(args.input_file)[0]):
+            sys.exit(f"ERROR: File {args.input_file} not found in directory.")
+        input_files = resolve_inputs(args.input_file)
+        if len(input_files) != 1:
+            sys.exit(f"ERROR: --lookup and --count read one roster, and {args.input_file} holds {len(input_files)}.")
+        with open_roster_index(input_files[0], args.index_db, get_cache_dir() if args.cache else None) as index_path:
+            if args.lookup:
+                courses = find_student_courses(index_path, args.lookup)
+                print(f'{args.lookup} is listed in {len(courses)} course(s)'
+                      + ''.join(f'\n  {course}' for course in courses))
+            if args.count:
+                print(f'{args.count}: {count_course_students(index_path, args.count, filters)} student(s) '
+                      f'filtered by {filters}')
+        return
+
+    profile = RunProfile() if args.profile else None
+    if args.cprofile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        compute([args.input_file] + args.input, args.output_dir, args.filters, engine=args.engine,
+                max_open_files=args.max_open_files, workers=args.workers, include_empty=args.include_empty,
+                start_method=args.start_method, use_cache=args.cache, incremental=args.incremental,
+                profile=profile, output_format=args.output_format, compress=args.deflate, sheets_by=args.sheets_by,
+                parquet_dir=args.parquet, partition_by=args.partition_by, index_path=args.index_db)
+    finally:
+        if args.cprofile:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            print(f'Wrote cProfile stats to {args.cprofile}')
+    if profile:
+        import json
+
+        report = profile.report()
+        report.update(engine=args.engine, inputs=[args.input_file] + args.input, filters=args.filters)
+        with open(args.profile, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Wrote profile to {args.profile}')
 
 if __name__ == '__main__':
     main()
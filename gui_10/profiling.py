@@ -0,0 +1,150 @@
+import contextlib
+import os
+import sys
+import time
+from collections import Counter
+
+
+def get_peak_rss_kb(children=False):
+    """Return the peak RSS of this process (or of its finished children) in KiB, or None on Windows."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and KiB on Linux.
+    return usage.ru_maxrss // 1024 if sys.platform == 'darwin' else usage.ru_maxrss
+
+
+def run_task(fn, args):
+    """Run fn(*args) in a pool worker and return its result with the worker's resource use."""
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = fn(*args)
+    return result, {
+        'pid': os.getpid(),
+        'wall': time.perf_counter() - wall,
+        'cpu': time.process_time() - cpu,
+        'peak_rss_kb': get_peak_rss_kb(),
+    }
+
+
+class RunProfile:
+    """Per-stage timings, row and byte counters and per-worker resource use of one run."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = Counter()
+        self.workers = {}
+        self.started = (time.perf_counter(), time.process_time())
+        # Wall time charged to stages nested inside each open stage, innermost last.
+        self.nested = []
+
+    def add(self, name, wall, cpu=None):
+        """Charge wall (and CPU) seconds to a stage."""
+        totals = self.stages.setdefault(name, {'wall': 0.0, 'cpu': None})
+        totals['wall'] += wall
+        if cpu is not None:
+            totals['cpu'] = (totals['cpu'] or 0.0) + cpu
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Charge the time spent inside the with block to a stage."""
+        self.nested.append(0.0)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            nested = self.nested.pop()
+            if self.nested:
+                self.nested[-1] += wall
+            self.add(name, wall - nested, None if nested else cpu)
+
+    def time_iter(self, name, iterable, count=None):
+        """Yield from iterable, charging the wall time spent producing each item to a stage."""
+        perf_counter = time.perf_counter
+        nested = self.nested
+        wall = 0.0
+        items = 0
+        iterator = iter(iterable)
+        try:
+            while True:
+                nested.append(0.0)
+                start = perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed = perf_counter() - start
+                    wall += elapsed - nested.pop()
+                    if nested:
+                        nested[-1] += elapsed
+                items += 1
+                yield item
+        finally:
+            self.add(name, wall)
+            if count:
+                self.counters[count] += items
+
+    def submit(self, executor, fn, *args):
+        """Submit fn(*args) to executor, recording the worker's resource use when it finishes."""
+        from concurrent.futures import Future
+
+        outer = Future()
+
+        def done(inner):
+            try:
+                result, worker = inner.result()
+            except BaseException as e:
+                outer.set_exception(e)
+                return
+            totals = self.workers.setdefault(worker['pid'], {'tasks': 0, 'wall': 0.0, 'cpu': 0.0, 'peak_rss_kb': None})
+            totals['tasks'] += 1
+            totals['wall'] += worker['wall']
+            totals['cpu'] += worker['cpu']
+            totals['peak_rss_kb'] = worker['peak_rss_kb']
+            outer.set_result(result)
+
+        executor.submit(run_task, fn, args).add_done_callback(done)
+        return outer
+
+    def report(self):
+        """Return the profile as a JSON-serializable dict."""
+        wall, cpu = self.started
+        return {
+            'wall': time.perf_counter() - wall,
+            'cpu': time.process_time() - cpu,
+            'stages': self.stages,
+            'counters': dict(self.counters),
+            'peak_rss_kb': get_peak_rss_kb(),
+            'children_peak_rss_kb': get_peak_rss_kb(children=True),
+            'workers': {str(pid): totals for pid, totals in self.workers.items()},
+        }
+
+
+class NullProfile:
+    """Stands in for a RunProfile when a run is not profiled; it is false and records nothing."""
+
+    def __bool__(self):
+        return False
+
+    @property
+    def counters(self):
+        return Counter()
+
+    def add(self, name, wall, cpu=None):
+        pass
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+    def time_iter(self, name, iterable, count=None):
+        return iterable
+
+    def submit(self, executor, fn, *args):
+        return executor.submit(fn, *args)
+
+
+# The profile engines record into unless they are given a RunProfile.
+NULL_PROFILE = NullProfile()
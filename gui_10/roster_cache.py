@@ -0,0 +1,224 @@
+import os
+import sys
+
+from rosters import (
+    BOSP_AGREEMENT_PREFIXES, DedupIndex, compile_row_filter, get_input_size, get_row_getters,
+    iter_rows_with_progress, open_input, open_roster, project_row, split_zip_member,
+)
+from writers import write_file_atomically
+
+
+# Bump when the layout of a cached roster changes; entries written with another version are ignored.
+ROSTER_CACHE_VERSION = 1
+# Cached rosters are removed, least recently used first, once together they take up more than this.
+ROSTER_CACHE_MAX_BYTES = 512 << 20
+# Starts every cached roster file, ahead of the marshalled columns.
+ROSTER_CACHE_MAGIC = b'SCPDROSTER'
+# Per-row columns of a parsed roster, each an array of ids into the matching table.
+ROSTER_ROW_COLUMNS = ['course', 'student', 'tuition_group', 'agreement', 'plan_code']
+
+
+def get_cache_dir():
+    """Return the per-user directory parsed rosters are cached in."""
+    base = os.environ.get('LOCALAPPDATA') if sys.platform == 'win32' else os.environ.get('XDG_CACHE_HOME')
+    return os.path.join(base or os.path.join(os.path.expanduser('~'), '.cache'), 'scpd-auto-parser')
+
+
+def hash_file(input_file, block_size=1 << 20):
+    """Return the hex BLAKE2b digest of a file's contents, after decompression (see open_input)."""
+    import hashlib
+
+    digest = hashlib.blake2b(digest_size=16)
+    input_handle, f, _ = open_input(input_file)
+    with input_handle:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_content_hash(input_file, cache_dir):
+    """Return the content hash of input_file, reusing the last one while its size and mtime are unchanged."""
+    import json
+
+    index_file = os.path.join(cache_dir, 'index.json')
+    try:
+        with open(index_file, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    # A ZIP member changes with its archive.
+    stat = os.stat(split_zip_member(input_file)[0])
+    path = os.path.abspath(input_file)
+    entry = index.get(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['hash']
+
+    content_hash = hash_file(input_file)
+    # Forget inputs that have since been deleted or moved.
+    index = {key: value for key, value in index.items() if os.path.exists(split_zip_member(key)[0])}
+    index[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': content_hash}
+    write_file_atomically(index_file, json.dumps(index).encode('utf-8'))
+    return content_hash
+
+
+def parse_roster(input_file, progress=None):
+    """Parse the input once into a columnar roster that any filter selection can be applied to."""
+    import array
+
+    tables = {column: {} for column in ROSTER_ROW_COLUMNS}
+    row_columns = {column: array.array('I') for column in ROSTER_ROW_COLUMNS}
+    appenders = [row_columns[column].append for column in ROSTER_ROW_COLUMNS]
+    lookups = [tables[column] for column in ROSTER_ROW_COLUMNS]
+
+    roster_input, reader, tell = open_roster(input_file)
+    with roster_input:
+        getters = get_row_getters(next(reader, []))
+        filter_getter, _, bosp_col_exists = getters
+        if progress:
+            reader = iter_rows_with_progress(reader, tell, get_input_size(input_file), progress, {})
+        agreement = ''
+        for row in reader:
+            if not row:
+                continue
+            if bosp_col_exists:
+                course_name, tuition_group, agreement = filter_getter(row)
+            else:
+                course_name, tuition_group = filter_getter(row)
+            emplid, email, last_name, first_name, sunet_id, plan_code = project_row(row, getters)
+            student = (emplid, email, last_name, first_name, sunet_id)
+            for append, table, value in zip(appenders, lookups, (course_name, student, tuition_group, agreement, plan_code)):
+                append(table.setdefault(value, len(table)))
+
+    roster = {column: list(tables[column]) for column in ROSTER_ROW_COLUMNS}
+    roster['rows'] = row_columns
+    roster['bosp_col_exists'] = bosp_col_exists
+    return roster
+
+
+def save_cached_roster(cache_file, roster):
+    """Write a parsed roster to cache_file as marshalled columns."""
+    import marshal
+
+    payload = {column: roster[column] for column in ROSTER_ROW_COLUMNS if column != 'student'}
+    # Students are stored as five columns of strings rather than one list of tuples.
+    payload['student'] = [list(field) for field in zip(*roster['student'])] if roster['student'] else [[]] * 5
+    payload['rows'] = {column: ids.tobytes() for column, ids in roster['rows'].items()}
+    payload['bosp_col_exists'] = roster['bosp_col_exists']
+    payload['version'] = ROSTER_CACHE_VERSION
+    write_file_atomically(cache_file, ROSTER_CACHE_MAGIC + marshal.dumps(payload))
+
+
+def load_cached_roster(cache_file):
+    """Read a roster written by save_cached_roster, or return None if it is missing, stale or damaged."""
+    import array
+    import marshal
+
+    try:
+        with open(cache_file, 'rb') as f:
+            data = f.read()
+        if not data.startswith(ROSTER_CACHE_MAGIC):
+            return None
+        payload = marshal.loads(memoryview(data)[len(ROSTER_CACHE_MAGIC):])
+        if payload.get('version') != ROSTER_CACHE_VERSION:
+            return None
+        roster = {column: payload[column] for column in ROSTER_ROW_COLUMNS if column != 'student'}
+        roster['student'] = list(zip(*payload['student']))
+        roster['rows'] = {}
+        for column in ROSTER_ROW_COLUMNS:
+            ids = roster['rows'][column] = array.array('I')
+            ids.frombytes(payload['rows'][column])
+        roster['bosp_col_exists'] = payload['bosp_col_exists']
+        return roster
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, ValueError, TypeError, KeyError, AttributeError) as e:
+        print(f"Ignoring unreadable cached roster {cache_file}: {e}")
+        return None
+
+
+def evict_cached_rosters(cache_dir, max_bytes=ROSTER_CACHE_MAX_BYTES):
+    """Remove the least recently used cached rosters until together they fit in max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.roster'):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
+
+
+def get_cached_roster(input_file, cache_dir, progress=None, max_bytes=ROSTER_CACHE_MAX_BYTES):
+    """Return the parsed roster of input_file, from cache_dir when it was parsed before."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_file = os.path.join(cache_dir, f'{get_content_hash(input_file, cache_dir)}.roster')
+    except OSError as e:
+        print(f"Roster cache unavailable: {e}")
+        return parse_roster(input_file, progress)
+
+    roster = load_cached_roster(cache_file)
+    if roster is not None:
+        print(f'Using cached roster {cache_file}')
+        # The mtime of a cached roster records when it was last used, for eviction.
+        os.utime(cache_file)
+        return roster
+
+    roster = parse_roster(input_file, progress)
+    try:
+        save_cached_roster(cache_file, roster)
+        evict_cached_rosters(cache_dir, max_bytes)
+    except OSError as e:
+        print(f"Could not cache the parsed roster: {e}")
+    return roster
+
+
+def iter_roster_rows(roster, tuition_filter_list, counters=None):
+    """Yield (course_name, output_row) from a parsed roster, as iter_partitioned_rows does from a reader."""
+    bosp_col_exists = roster['bosp_col_exists']
+    accept = compile_row_filter(tuition_filter_list, bosp_col_exists)
+    courses, students = roster['course'], roster['student']
+    tuition_groups, agreements, plan_codes = roster['tuition_group'], roster['agreement'], roster['plan_code']
+
+    for course_name in courses:
+        yield course_name, None
+
+    accepted = {}
+    seen = DedupIndex(pack=False)
+    filtered = duplicates = 0
+    agreement_count = len(agreements)
+    student_count = len(students)
+    rows = roster['rows']
+    for course_id, student_id, tuition_id, agreement_id, plan_id in zip(*[rows[column] for column in ROSTER_ROW_COLUMNS]):
+        pair = tuition_id * agreement_count + agreement_id
+        keep = accepted.get(pair)
+        if keep is None:
+            keep = accepted[pair] = accept(tuition_groups[tuition_id], agreements[agreement_id])
+        if not keep:
+            filtered += 1
+            continue
+        if not seen.add(course_id * student_count + student_id):
+            duplicates += 1
+            continue
+
+        emplid, email, last_name, first_name, sunet_id = students[student_id]
+        course_name = courses[course_id]
+        if first_name is None:
+            # Fail on a name without a comma the same way the streaming path does.
+            raise ValueError(f"{course_name}: 'Last First Name' {last_name!r} has no comma")
+        tuition_group = tuition_groups[tuition_id]
+        if bosp_col_exists:
+            agreement = agreements[agreement_id]
+            bosp = 'BOSP' if agreement[:1] in BOSP_AGREEMENT_PREFIXES else ''
+            yield course_name, (course_name, emplid, email, last_name, first_name, sunet_id,
+                                tuition_group, plan_codes[plan_id], bosp)
+        else:
+            yield course_name, (course_name, emplid, email, last_name, first_name, sunet_id,
+                                tuition_group, plan_codes[plan_id])
+
+    if counters is not None:
+        counters.update(rows_filtered=filtered, rows_duplicate=duplicates)
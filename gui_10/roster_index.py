@@ -0,0 +1,266 @@
+import os
+
+from rosters import (
+    BOSP_AGREEMENT_PREFIXES, DedupIndex, get_current_datetime, get_input_size, get_row_getters,
+    iter_rows_with_progress, open_roster, project_row, split_zip_member,
+)
+from writers import get_temp_path
+from roster_cache import hash_file
+
+
+# File name of the SQLite roster index inside a cache directory.
+ROSTER_INDEX_FILE = 'roster_index.sqlite'
+# Bump when the roster index schema changes; an index written with another version is rebuilt.
+ROSTER_INDEX_VERSION = 2
+# One row per non-empty input row, in input order, projected and name-split as in parse_roster.
+ROSTER_INDEX_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE courses (course_id INTEGER PRIMARY KEY, course TEXT NOT NULL);
+CREATE TABLE roster (
+    row_id INTEGER PRIMARY KEY,
+    course TEXT NOT NULL,
+    emplid TEXT NOT NULL,
+    email TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    first_name TEXT,
+    sunet_id TEXT NOT NULL,
+    tuition_group TEXT NOT NULL,
+    plan_code TEXT NOT NULL,
+    agreement TEXT NOT NULL,
+    bosp INTEGER NOT NULL
+);
+"""
+# Created after the bulk load, which is much faster than maintaining them row by row. A course query
+# filters on the course and the tuition groups together; with a separate tuition_group index SQLite
+# would search by tuition group and scan that group's rows of every course, once per course.
+ROSTER_INDEX_INDEXES = [
+    'CREATE INDEX roster_course ON roster (course, tuition_group)',
+    'CREATE INDEX roster_emplid ON roster (emplid)',
+    'CREATE INDEX roster_sunet_id ON roster (sunet_id)',
+]
+
+def get_input_signature(input_file):
+    """Return the path, size and mtime of input_file, which identify it while it is unchanged."""
+    # A ZIP member changes with its archive.
+    stat = os.stat(split_zip_member(input_file)[0])
+    return f'{os.path.abspath(input_file)}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def connect_roster_index(index_path):
+    """Open a roster index read-only, so lookups can never create or change it."""
+    import pathlib
+    import sqlite3
+
+    return sqlite3.connect(pathlib.Path(os.path.abspath(index_path)).as_uri() + '?mode=ro', uri=True)
+
+
+def read_index_meta(index_path):
+    """Return the meta table of a roster index as a dict, or None if it is missing or unreadable."""
+    import sqlite3
+
+    if not os.path.isfile(index_path):
+        return None
+    try:
+        connection = connect_roster_index(index_path)
+        try:
+            return dict(connection.execute('SELECT key, value FROM meta'))
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        print(f"Ignoring unreadable roster index {index_path}: {e}")
+        return None
+
+
+def iter_index_rows(reader, getters, courses):
+    """Yield the roster table rows of a csv.reader, adding each course to courses in first-seen order."""
+    filter_getter, _, bosp_col_exists = getters
+    agreement = ''
+    for row in reader:
+        if not row:
+            continue
+        if bosp_col_exists:
+            course_name, tuition_group, agreement = filter_getter(row)
+        else:
+            course_name, tuition_group = filter_getter(row)
+        courses.setdefault(course_name, len(courses))
+        emplid, email, last_name, first_name, sunet_id, plan_code = project_row(row, getters)
+        yield (course_name, emplid, email, last_name, first_name, sunet_id, tuition_group, plan_code, agreement,
+               agreement[:1] in BOSP_AGREEMENT_PREFIXES)
+
+
+def build_roster_index(input_file, index_path, content_hash=None, progress=None):
+    """Load every row of input_file into a new SQLite roster index at index_path and return the row count."""
+    import sqlite3
+
+    temp_path = get_temp_path(index_path)
+    courses = {}
+    try:
+        connection = sqlite3.connect(temp_path)
+        try:
+            # The file only becomes the index once it is complete, so a crash can at worst leave a temporary file.
+            connection.execute('PRAGMA journal_mode = OFF')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.executescript(ROSTER_INDEX_SCHEMA)
+            roster_input, reader, tell = open_roster(input_file)
+            with roster_input, connection:
+                getters = get_row_getters(next(reader, []))
+                if progress:
+                    reader = iter_rows_with_progress(reader, tell, get_input_size(input_file), progress, {})
+                connection.executemany('INSERT INTO roster VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                       iter_index_rows(reader, getters, courses))
+                connection.executemany('INSERT INTO courses VALUES (?, ?)',
+                                       ((course_id, course_name) for course_name, course_id in courses.items()))
+                for statement in ROSTER_INDEX_INDEXES:
+                    connection.execute(statement)
+                meta = {
+                    'version': ROSTER_INDEX_VERSION,
+                    'input_file': os.path.abspath(input_file),
+                    'input_signature': get_input_signature(input_file),
+                    'content_hash': content_hash or '',
+                    'bosp_col_exists': int(getters[2]),
+                    'loaded_at': get_current_datetime('%Y-%m-%d %H:%M:%S'),
+                }
+                connection.executemany('INSERT INTO meta VALUES (?, ?)',
+                                       ((key, str(value)) for key, value in meta.items()))
+            rows_loaded = connection.execute('SELECT COUNT(*) FROM roster').fetchone()[0]
+        finally:
+            connection.close()
+        os.replace(temp_path, index_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return rows_loaded
+
+
+def refresh_roster_index(input_file, index_path, progress=None):
+    """Make the roster index at index_path hold input_file, loading it if it is missing or stale."""
+    import sqlite3
+
+    meta = read_index_meta(index_path)
+    if meta and meta.get('version') != str(ROSTER_INDEX_VERSION):
+        meta = None
+    if meta and meta.get('input_signature') == get_input_signature(input_file):
+        print(f'Using roster index {index_path}')
+        return
+
+    content_hash = hash_file(input_file)
+    if meta and meta.get('content_hash') == content_hash:
+        connection = sqlite3.connect(index_path)
+        try:
+            with connection:
+                connection.execute("UPDATE meta SET value = ? WHERE key = 'input_signature'",
+                                   (get_input_signature(input_file),))
+        finally:
+            connection.close()
+        print(f'Using roster index {index_path}')
+        return
+
+    rows_loaded = build_roster_index(input_file, index_path, content_hash, progress)
+    print(f'Loaded {rows_loaded} rows into roster index {index_path}')
+
+
+def open_roster_index(input_file, index_path=None, cache_dir=None, progress=None):
+    """Return a context manager giving the path of a roster index that holds input_file."""
+    import contextlib
+    import shutil
+    import tempfile
+
+    @contextlib.contextmanager
+    def opened():
+        if index_path or cache_dir:
+            if index_path:
+                path = index_path
+            else:
+                os.makedirs(cache_dir, exist_ok=True)
+                path = os.path.join(cache_dir, ROSTER_INDEX_FILE)
+            refresh_roster_index(input_file, path, progress)
+            yield path
+            return
+        temp_dir = tempfile.mkdtemp(prefix='roster-index-')
+        try:
+            path = os.path.join(temp_dir, ROSTER_INDEX_FILE)
+            rows_loaded = build_roster_index(input_file, path, progress=progress)
+            print(f'Loaded {rows_loaded} rows into a temporary roster index')
+            yield path
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return opened()
+
+
+def get_index_filter(tuition_filter_list, bosp_col_exists):
+    """Turn the selected filters into an SQL condition and parameters selecting the rows compile_row_filter keeps."""
+    tuition_filters = list(dict.fromkeys(f for f in tuition_filter_list if f != 'BOSP'))
+    bosp_filter = 'BOSP' in tuition_filter_list and bosp_col_exists
+    tuition_condition = f"tuition_group IN ({', '.join('?' * len(tuition_filters))})"
+
+    if not tuition_filters and 'BOSP' not in tuition_filter_list:
+        return '1', []
+    if not bosp_filter:
+        return (tuition_condition if tuition_filters else '0'), tuition_filters
+    if not tuition_filters:
+        return 'bosp', []
+    return f'({tuition_condition} OR bosp)', tuition_filters
+
+
+def iter_index_course_rows(connection, course_name, condition, parameters, bosp_col_exists):
+    """Yield the filtered, deduplicated output rows of one course from a roster index, in input order."""
+    cursor = connection.execute(
+        'SELECT emplid, email, last_name, first_name, sunet_id, tuition_group, plan_code, bosp '
+        f'FROM roster WHERE course = ? AND {condition} ORDER BY row_id',
+        [course_name] + parameters
+    )
+    seen = DedupIndex()
+    for emplid, email, last_name, first_name, sunet_id, tuition_group, plan_code, bosp in cursor:
+        if first_name is None:
+            # Fail on a name without a comma the same way the streaming path does.
+            raise ValueError(f"{course_name}: 'Last First Name' {last_name!r} has no comma")
+        if not seen.add((emplid, email, last_name, first_name, sunet_id)):
+            continue
+        if bosp_col_exists:
+            yield (course_name, emplid, email, last_name, first_name, sunet_id, tuition_group, plan_code,
+                   'BOSP' if bosp else '')
+        else:
+            yield course_name, emplid, email, last_name, first_name, sunet_id, tuition_group, plan_code
+
+
+def iter_index_rows_by_course(connection, tuition_filter_list, bosp_col_exists, counters=None):
+    """Yield (course_name, output_row) from a roster index, one indexed query per course."""
+    condition, parameters = get_index_filter(tuition_filter_list, bosp_col_exists)
+    course_names = [course_name for course_name, in connection.execute('SELECT course FROM courses ORDER BY course_id')]
+    rows_out = 0
+    for course_name in course_names:
+        yield course_name, None
+        for output_row in iter_index_course_rows(connection, course_name, condition, parameters, bosp_col_exists):
+            rows_out += 1
+            yield course_name, output_row
+
+    if counters is not None:
+        counters.update(rows_out=rows_out)
+
+
+def find_student_courses(index_path, student_id):
+    """Return the courses a student is listed in, by EMPLID or SUNet ID, in input order."""
+    connection = connect_roster_index(index_path)
+    try:
+        return [course_name for course_name, _ in connection.execute(
+            'SELECT course, MIN(row_id) FROM roster WHERE emplid = ? OR sunet_id = ? GROUP BY course ORDER BY 2',
+            (student_id, student_id)
+        )]
+    finally:
+        connection.close()
+
+
+def count_course_students(index_path, course_name, tuition_filter_list):
+    """Return how many rows the filtered, deduplicated roster of one course has."""
+    connection = connect_roster_index(index_path)
+    try:
+        bosp_col_exists = connection.execute("SELECT value FROM meta WHERE key = 'bosp_col_exists'").fetchone()[0] == '1'
+        condition, parameters = get_index_filter(tuition_filter_list, bosp_col_exists)
+        return connection.execute(
+            f'SELECT COUNT(*) FROM (SELECT 1 FROM roster WHERE course = ? AND {condition} '
+            'GROUP BY emplid, email, last_name, first_name, sunet_id)',
+            [course_name] + parameters
+        ).fetchone()[0]
+    finally:
+        connection.close()
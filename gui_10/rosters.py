@@ -0,0 +1,288 @@
+import csv
+import os
+import datetime
+import io
+import operator
+
+
+# Input rows between two calls of a progress callback.
+PROGRESS_INTERVAL = 2048
+
+
+def get_current_datetime(fmt='%m-%d %I:%M:%S %p'):
+    """Get the current date and time formatted according to the provided format."""
+    return datetime.datetime.now().strftime(fmt)
+
+
+class DedupIndex:
+    """Track the row identities (compare_row keys) seen so far, packed into bytes unless pack is False."""
+
+    def __init__(self, pack=True):
+        self.keys = set()
+        self.pack = pack
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return (self._pack(key) if self.pack else key) in self.keys
+
+    def add(self, key):
+        """Record key and return True if it had not been seen before."""
+        keys = self.keys
+        size = len(keys)
+        keys.add(self._pack(key) if self.pack else key)
+        return len(keys) != size
+
+    @staticmethod
+    def _pack(key):
+        return '\x1f'.join(key).encode('utf-8', 'surrogatepass')
+
+
+# First letters of a Study Agreement Code that mark a BOSP student.
+BOSP_AGREEMENT_PREFIXES = frozenset(('O', 'X'))
+
+def compile_row_filter(tuition_filter_list, bosp_col_exists):
+    """Turn the selected filters ('BOSP' or Tuition Group Desc values) into one predicate of (tuition_group, agreement)."""
+    tuition_filters = frozenset(f for f in tuition_filter_list if f != 'BOSP')
+    bosp_filter = 'BOSP' in tuition_filter_list
+
+    if not tuition_filters and not bosp_filter:
+        return lambda tuition_group, agreement: True
+    if not bosp_filter or not bosp_col_exists:
+        # Without the Study Agreement Code column no row can match BOSP.
+        return lambda tuition_group, agreement: tuition_group in tuition_filters
+    if not tuition_filters:
+        return lambda tuition_group, agreement: agreement[:1] in BOSP_AGREEMENT_PREFIXES
+    return lambda tuition_group, agreement: (
+        tuition_group in tuition_filters or agreement[:1] in BOSP_AGREEMENT_PREFIXES
+    )
+
+
+def get_output_columns(bosp_col_exists):
+    """Return the output column names, including the BOSP column when the input has one."""
+    desired_columns = [
+        'Course Offering Subject-Num Desc', 'EMPLID', 'Preferred Email Address',
+        'Last Name', 'First Name', 'SUNet ID', 'Tuition Group Desc',
+        'Stu Current Acad Plan Code'
+    ]
+    if bosp_col_exists:
+        desired_columns.append('Study Agreement Code')
+    return desired_columns
+
+
+# Input columns the filter predicate needs, read before anything else in a row.
+FILTER_COLUMNS = ['Course Offering Subject-Num Desc', 'Tuition Group Desc']
+# Remaining input columns, only read for rows that pass the filter.
+PROJECTED_COLUMNS = [
+    'EMPLID', 'Preferred Email Address', 'Last First Name', 'SUNet ID', 'Stu Current Acad Plan Code'
+]
+
+def get_row_getters(header):
+    """Return itemgetters for the filter and projected columns of a header, and whether it has the BOSP column."""
+    # Later duplicates win, as they do with csv.DictReader.
+    positions = {column: index for index, column in enumerate(header)}
+    bosp_col_exists = 'Study Agreement Code' in positions
+    filter_columns = FILTER_COLUMNS + ['Study Agreement Code'] if bosp_col_exists else FILTER_COLUMNS
+    missing = [column for column in filter_columns + PROJECTED_COLUMNS if column not in positions]
+    if missing:
+        raise KeyError(missing[0])
+    filter_getter = operator.itemgetter(*[positions[column] for column in filter_columns])
+    projector = operator.itemgetter(*[positions[column] for column in PROJECTED_COLUMNS])
+    return filter_getter, projector, bosp_col_exists
+
+
+def project_row(row, getters):
+    """Return (emplid, email, last_name, first_name, sunet_id, plan_code) of a row; first_name is None without a comma."""
+    _, projector, _ = getters
+    emplid, email, last_first_name, sunet_id, plan_code = projector(row)
+    last_name, comma, first_name = last_first_name.partition(',')
+    return emplid, email, last_name, first_name.strip() if comma else None, sunet_id, plan_code
+
+
+def iter_partitioned_rows(rows, getters, tuition_filter_list, counters=None, keep_rows=False):
+    """Yield (course_name, output_row) for every filtered, deduplicated row, and (course_name, None) before a course's first."""
+    filter_getter, _, bosp_col_exists = getters
+    accept = compile_row_filter(tuition_filter_list, bosp_col_exists)
+
+    # Course names, tuition groups and plan codes repeat across thousands of rows. Kept rows share
+    # one string object per distinct value, which matters to callers that hold on to the rows.
+    courses = {}
+    strings = {}
+    seen = DedupIndex(pack=not keep_rows)
+    agreement = None
+    blank = filtered = duplicates = 0
+    for row in rows:
+        if not row:
+            blank += 1
+            continue
+        if bosp_col_exists:
+            course_name, tuition_group, agreement = filter_getter(row)
+        else:
+            course_name, tuition_group = filter_getter(row)
+        interned = courses.get(course_name)
+        if interned is None:
+            courses[course_name] = course_name
+            yield course_name, None
+        else:
+            course_name = interned
+        if not accept(tuition_group, agreement):
+            filtered += 1
+            continue
+
+        emplid, email, last_name, first_name, sunet_id, plan_code = project_row(row, getters)
+        if first_name is None:
+            raise ValueError(f"{course_name}: 'Last First Name' {last_name!r} has no comma")
+        tuition_group = strings.setdefault(tuition_group, tuition_group)
+        plan_code = strings.setdefault(plan_code, plan_code)
+        compare_row = (course_name, emplid, email, last_name, first_name, sunet_id)
+        if not seen.add(compare_row):
+            duplicates += 1
+            continue
+
+        if bosp_col_exists:
+            bosp = 'BOSP' if agreement[:1] in BOSP_AGREEMENT_PREFIXES else ''
+            yield course_name, compare_row + (tuition_group, plan_code, bosp)
+        else:
+            yield course_name, compare_row + (tuition_group, plan_code)
+
+    if counters is not None:
+        counters.update(rows_blank=blank, rows_filtered=filtered, rows_duplicate=duplicates)
+
+
+def iter_rows_with_progress(reader, tell, total_bytes, progress, output_files):
+    """Pass rows through, calling progress(rows_parsed, bytes_read, total_bytes, courses_written) periodically."""
+    rows_parsed = 0
+    for row in reader:
+        yield row
+        rows_parsed += 1
+        if rows_parsed % PROGRESS_INTERVAL == 0:
+            progress(rows_parsed, tell(), total_bytes, len(output_files))
+    progress(rows_parsed, total_bytes, total_bytes, len(output_files))
+
+
+# Workbook formats read natively by open_roster; anything else is parsed as CSV.
+XLSX_EXTENSIONS = ('.xlsx', '.xlsm')
+
+def is_xlsx(input_file):
+    """Return whether input_file is an Excel workbook rather than a CSV."""
+    return input_file.lower().endswith(XLSX_EXTENSIONS)
+
+
+def iter_xlsx_rows(xlsx_input):
+    """Stream the first worksheet of an open .xlsx file in read-only mode, as lists of strings."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(xlsx_input, read_only=True, data_only=True)
+    try:
+        for values in workbook.worksheets[0].iter_rows(values_only=True):
+            if any(value is not None for value in values):
+                yield ['' if value is None else str(value) for value in values]
+    finally:
+        workbook.close()
+
+
+# Leading bytes of the compressed formats open_input decompresses on the fly.
+COMPRESSION_MAGIC = {b'\x1f\x8b': 'gzip', b'BZh': 'bz2', b'\xfd7zXZ\x00': 'xz', b'PK\x03\x04': 'zip'}
+# Extensions of the exports read from a ZIP archive or a watched folder; other files are ignored.
+ROSTER_EXTENSIONS = ('.csv',) + XLSX_EXTENSIONS
+
+def split_zip_member(input_file):
+    """Split an 'archive.zip/member.csv' input into (archive, member), or return (input_file, None)."""
+    if os.path.isfile(input_file):
+        return input_file, None
+    archive = input_file
+    while True:
+        parent = os.path.dirname(archive)
+        if not parent or parent == archive:
+            return input_file, None
+        archive = parent
+        if os.path.isfile(archive):
+            return archive, os.path.relpath(input_file, archive).replace(os.sep, '/')
+
+
+def get_compression(input_file):
+    """Return 'gzip', 'bz2', 'xz' or 'zip' if input_file is compressed, judging by its first bytes, else None."""
+    if is_xlsx(input_file):
+        return None
+    if split_zip_member(input_file)[1] is not None:
+        return 'zip'
+    with open(input_file, 'rb') as f:
+        head = f.read(6)
+    for magic, compression in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def list_zip_rosters(archive):
+    """Return the names of the CSV and XLSX members of a ZIP archive, skipping hidden and macOS metadata files."""
+    import zipfile
+
+    with zipfile.ZipFile(archive) as zip_file:
+        return [info.filename for info in zip_file.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(ROSTER_EXTENSIONS)
+                and not info.filename.startswith('__MACOSX/')
+                and not info.filename.rsplit('/', 1)[-1].startswith(('.', '~$'))]
+
+
+def get_input_size(input_file):
+    """Return the size on disk of an input, which is the compressed size of a ZIP member."""
+    archive, member = split_zip_member(input_file)
+    if member is None:
+        return os.path.getsize(input_file)
+    import zipfile
+
+    with zipfile.ZipFile(archive) as zip_file:
+        return zip_file.getinfo(member).compress_size
+
+
+def open_input(input_file):
+    """Open a roster input as bytes, decompressing it on the fly; returns (input_handle, stream, tell)."""
+    import contextlib
+
+    archive, member = split_zip_member(input_file)
+    compression = get_compression(input_file)
+    if member is None and compression == 'zip':
+        raise ValueError(f"{input_file} is a ZIP archive; pass it to compute(), which reads each roster in it")
+    if member is not None:
+        import zipfile
+
+        with zipfile.ZipFile(archive) as zip_file:
+            info = zip_file.getinfo(member)
+            raw = zip_file.fp
+            # The open member keeps the archive's file open after the ZipFile is closed.
+            stream = zip_file.open(info)
+        start = info.header_offset
+        return stream, stream, lambda: min(max(raw.tell() - start, 0), info.compress_size)
+
+    raw = open(input_file, 'rb')
+    if compression is None:
+        return raw, raw, raw.tell
+    with contextlib.ExitStack() as input_handle:
+        input_handle.enter_context(raw)
+        if compression == 'gzip':
+            import gzip
+            stream = gzip.GzipFile(fileobj=raw)
+        elif compression == 'bz2':
+            import bz2
+            stream = bz2.BZ2File(raw)
+        else:
+            import lzma
+            stream = lzma.LZMAFile(raw)
+        input_handle.enter_context(stream)
+        return input_handle.pop_all(), stream, raw.tell
+
+
+def is_compressed(input_file):
+    """Return whether input_file is read through a decompressor (see get_compression)."""
+    return get_compression(input_file) is not None
+
+
+def open_roster(input_file):
+    """Open a .csv or .xlsx roster, possibly compressed, as (roster_input, reader, tell) for one streaming pass."""
+    roster_input, stream, tell = open_input(input_file)
+    if is_xlsx(input_file):
+        return roster_input, iter_xlsx_rows(stream), tell
+    # Decoded the way open(input_file, 'r') decodes a plain CSV.
+    return roster_input, csv.reader(io.TextIOWrapper(stream)), tell
@@ -0,0 +1,6 @@
+#!/usr/bin/env bash
+
+# Usage: run_mac_watch.sh <drop folder> <output folder> [filters...]
+current_dir="$( cd "$( dirname "${BASH_SOURCE[0]}" )" &> /dev/null && pwd )"
+
+python3 "$current_dir/process5.py" --watch "$@"
@@ -0,0 +1,415 @@
+import csv
+import os
+import time
+from collections import OrderedDict
+
+
+# Upper bound on roster files held open at once by a WriterPool.
+MAX_OPEN_FILES = 128
+# Rows buffered per roster before they are written out.
+BUFFER_ROWS = 256
+# I/O buffer of a roster written on its own, so a typical roster goes out in one or two writes.
+OUTPUT_BUFFER_BYTES = 1 << 20
+# I/O buffer of each file a WriterPool holds open; with MAX_OPEN_FILES handles this is 8 MiB in all.
+POOL_BUFFER_BYTES = 1 << 16
+
+
+def get_heading_row(course_name, desired_columns):
+    """Build the 'Course: <name>' row written above the column header."""
+    main_heading_row = {column: '' for column in desired_columns}
+    main_heading_row['Course Offering Subject-Num Desc'] = f'Course: {course_name}'
+    return main_heading_row
+
+def write_roster_header(pool, path, course_name, desired_columns):
+    """Write the 'Course: <name>' row and the column header that start every roster file in a pool."""
+    pool.writerow(path, list(get_heading_row(course_name, desired_columns).values()))
+    pool.writerow(path, desired_columns)
+
+def get_output_path(directory_path, course_name, date):
+    """Get the roster file path for a course."""
+    return os.path.join(directory_path, f'{course_name.replace(" ", "")} SCPD Roster {date}.csv')
+
+
+def get_temp_path(path):
+    """Return the temporary file a file is written to before being renamed to path."""
+    return f'{path}.{os.getpid()}.tmp'
+
+
+class RosterWriter:
+    """Write one roster file through a large buffer, into a temporary file that replaces it on success."""
+
+    def __init__(self, path, buffer_bytes=OUTPUT_BUFFER_BYTES):
+        self.path = path
+        self.temp_path = get_temp_path(path)
+        self.handle = open(self.temp_path, 'w', newline='', buffering=buffer_bytes)
+        writer = csv.writer(self.handle)
+        self.writerow = writer.writerow
+        self.writerows = writer.writerows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+    def close(self, commit=True):
+        """Close the file and move it into place, or discard it if commit is False."""
+        try:
+            self.handle.close()
+        except BaseException:
+            commit = False
+            raise
+        finally:
+            if commit:
+                os.replace(self.temp_path, self.path)
+            elif os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+
+
+class WriterPool:
+    """Write rows to many roster files while keeping at most max_open_files handles open."""
+
+    def __init__(self, max_open_files=MAX_OPEN_FILES, buffer_rows=BUFFER_ROWS, buffer_bytes=POOL_BUFFER_BYTES):
+        if max_open_files < 1:
+            raise ValueError("max_open_files must be at least 1")
+        self.max_open_files = max_open_files
+        self.buffer_rows = buffer_rows
+        self.buffer_bytes = buffer_bytes
+        self.handles = OrderedDict()
+        self.buffers = {}
+        self.created = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+    def writerow(self, path, row):
+        """Buffer one row for the file at path."""
+        buffer = self.buffers.get(path)
+        if buffer is None:
+            buffer = self.buffers[path] = []
+        buffer.append(row)
+        if len(buffer) >= self.buffer_rows:
+            self.flush(path)
+
+    def writerows(self, path, rows):
+        """Buffer several rows for the file at path."""
+        for row in rows:
+            self.writerow(path, row)
+
+    def flush(self, path):
+        """Write out the buffered rows for one file."""
+        rows = self.buffers.get(path)
+        if rows:
+            self._get_writer(path).writerows(rows)
+            rows.clear()
+
+    def close(self, commit=True):
+        """Flush every buffer, close all open handles and move the files into place, or discard them unless commit."""
+        try:
+            if commit:
+                for path in list(self.buffers):
+                    self.flush(path)
+        except BaseException:
+            commit = False
+            raise
+        finally:
+            while self.handles:
+                _, (handle, _) = self.handles.popitem(last=False)
+                handle.close()
+            for path in self.created:
+                if commit:
+                    os.replace(get_temp_path(path), path)
+                elif os.path.exists(get_temp_path(path)):
+                    os.remove(get_temp_path(path))
+            self.created.clear()
+
+    def _get_writer(self, path):
+        if path in self.handles:
+            self.handles.move_to_end(path)
+            return self.handles[path][1]
+
+        if len(self.handles) >= self.max_open_files:
+            _, (handle, _) = self.handles.popitem(last=False)
+            handle.close()
+
+        mode = 'a' if path in self.created else 'w'
+        handle = open(get_temp_path(path), mode, newline='', buffering=self.buffer_bytes)
+        self.created.add(path)
+        writer = csv.writer(handle)
+        self.handles[path] = (handle, writer)
+        return writer
+
+
+class SpooledWriterPool:
+    """Base for pools that spool every roster to a temporary CSV and build one output file from them on close."""
+
+    def __init__(self, output_path, max_open_files=MAX_OPEN_FILES):
+        import tempfile
+
+        self.output_path = output_path
+        self.spool_dir = tempfile.mkdtemp(prefix='rosters-')
+        self.spool = WriterPool(max_open_files)
+        self.spool_paths = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+    def writerow(self, path, row):
+        """Write one row to the roster for path."""
+        spool_path = self.spool_paths.get(path)
+        if spool_path is None:
+            spool_path = self._open(path)
+        self.spool.writerow(spool_path, row)
+
+    def writerows(self, path, rows):
+        """Write several rows to the roster for path."""
+        spool_path = self.spool_paths.get(path)
+        if spool_path is None:
+            spool_path = self._open(path)
+        self.spool.writerows(spool_path, rows)
+
+    def close(self, commit=True):
+        """Write the spooled rosters into the output and move it into place, or discard them if commit is False."""
+        import shutil
+
+        temp_path = get_temp_path(self.output_path)
+        try:
+            self.spool.close(commit)
+            if commit:
+                self._write_output(temp_path)
+                os.replace(temp_path, self.output_path)
+        finally:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _open(self, path):
+        spool_path = self.spool_paths[path] = os.path.join(self.spool_dir, f'{len(self.spool_paths)}.csv')
+        return spool_path
+
+    def _write_output(self, temp_path):
+        raise NotImplementedError
+
+
+class ZipWriterPool(SpooledWriterPool):
+    """Write roster files as the members of one ZIP archive, with the interface of WriterPool."""
+
+    def __init__(self, archive_path, root_dir, compress=False, max_open_files=MAX_OPEN_FILES):
+        super().__init__(archive_path, max_open_files)
+        self.root_dir = root_dir
+        self.compress = compress
+
+    def _write_output(self, temp_path):
+        import shutil
+        import zipfile
+
+        compression = zipfile.ZIP_DEFLATED if self.compress else zipfile.ZIP_STORED
+        date_time = time.localtime()[:6]
+        with open(temp_path, 'wb', buffering=OUTPUT_BUFFER_BYTES) as f, zipfile.ZipFile(f, 'w', compression) as archive:
+            for path, spool_path in self.spool_paths.items():
+                member = zipfile.ZipInfo(os.path.relpath(path, self.root_dir).replace(os.sep, '/'), date_time)
+                member.compress_type = compression
+                member.external_attr = 0o644 << 16
+                # Lets zipfile decide up front whether the member needs ZIP64 extensions.
+                member.file_size = os.path.getsize(spool_path)
+                with open(spool_path, 'rb') as spooled, archive.open(member, 'w') as member_file:
+                    shutil.copyfileobj(spooled, member_file, OUTPUT_BUFFER_BYTES)
+
+
+# Excel limits sheet titles to this many characters, none of them one of SHEET_TITLE_FORBIDDEN.
+SHEET_TITLE_MAX = 31
+SHEET_TITLE_FORBIDDEN = '[]:*?/\\'
+# How rosters are grouped into workbook sheets or Parquet partitions: by course, or by subject such as 'CS'.
+ROSTER_GROUPINGS = ['course', 'department']
+
+def get_department(course_name):
+    """Return the subject a course belongs to: the part of its name before the course number."""
+    department = course_name[:next((index for index, char in enumerate(course_name) if char.isdigit()),
+                                   len(course_name))].strip()
+    return department or course_name
+
+
+def get_sheet_key(path, sheets_by='course'):
+    """Return the sheet a roster file belongs on: its course as in the file name, or that course's subject."""
+    course = os.path.basename(path).split(' SCPD Roster ', 1)[0]
+    return get_department(course) if sheets_by == 'department' else course
+
+
+def get_sheet_title(key, used_titles):
+    """Turn a sheet key into a valid Excel sheet title not yet in used_titles, and add it there."""
+    title = ''.join('_' if char in SHEET_TITLE_FORBIDDEN else char for char in key).strip("'")[:SHEET_TITLE_MAX]
+    title = title or 'Roster'
+    candidate = title
+    number = 1
+    while candidate.lower() in used_titles:
+        number += 1
+        suffix = f' ({number})'
+        candidate = title[:SHEET_TITLE_MAX - len(suffix)] + suffix
+    used_titles.add(candidate.lower())
+    return candidate
+
+
+class XlsxWriterPool(SpooledWriterPool):
+    """Write rosters as the sheets of one Excel workbook, with the interface of WriterPool."""
+
+    def __init__(self, workbook_path, max_open_files=MAX_OPEN_FILES, sheets_by='course'):
+        super().__init__(workbook_path, max_open_files)
+        self.sheets_by = sheets_by
+
+    def _write_output(self, temp_path):
+        from openpyxl import Workbook
+
+        sheets = {}
+        for path, spool_path in self.spool_paths.items():
+            sheets.setdefault(get_sheet_key(path, self.sheets_by), []).append(spool_path)
+
+        workbook = Workbook(write_only=True)
+        used_titles = set()
+        for key, spool_paths in sheets.items():
+            sheet = workbook.create_sheet(get_sheet_title(key, used_titles))
+            for index, spool_path in enumerate(spool_paths):
+                if index:
+                    sheet.append([])
+                with open(spool_path, 'r', newline='') as f:
+                    for row in csv.reader(f):
+                        sheet.append(row)
+            # A finished sheet gives up its open temporary file; openpyxl keeps the file until the save.
+            sheet.close()
+        if not sheets:
+            workbook.create_sheet('Rosters')
+        workbook.save(temp_path)
+
+
+# Roster output formats: one CSV file per course, the same files as members of one ZIP archive,
+# or one Excel workbook with a sheet per course or department.
+OUTPUT_FORMATS = ['csv', 'zip', 'xlsx']
+
+def open_writer_pool(directory_path, max_open_files=MAX_OPEN_FILES, output_format='csv', compress=False,
+                     sheets_by='course'):
+    """Return the pool the rosters under directory_path are written through, for the given output format."""
+    if output_format == 'zip':
+        return ZipWriterPool(get_output_target(directory_path, output_format), os.path.dirname(directory_path),
+                             compress, max_open_files)
+    if output_format == 'xlsx':
+        return XlsxWriterPool(get_output_target(directory_path, output_format), max_open_files, sheets_by)
+    return WriterPool(max_open_files)
+
+
+def get_output_target(directory_path, output_format='csv'):
+    """Return what a run writes its rosters to: directory_path, or the ZIP archive or workbook named after it."""
+    return directory_path if output_format == 'csv' else f'{directory_path}.{output_format}'
+
+
+# Rows a ParquetExport holds before writing them out; each batch adds a file to every partition it has rows for.
+PARQUET_BATCH_ROWS = 1 << 18
+
+class ParquetExport:
+    """Write the rows of a run's rosters, a batch at a time, into a Hive-partitioned Parquet dataset."""
+
+    def __init__(self, dataset_dir, desired_columns, partition_by='course'):
+        self.dataset_dir = dataset_dir
+        self.columns = list(desired_columns)
+        self.partition_by = partition_by
+        self.rows = []
+        self.temp_dir = get_temp_path(dataset_dir)
+        self.batches_written = 0
+        self.departments = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+    def tee(self, rows):
+        """Pass (course_name, output_row) pairs through, as iter_partitioned_rows yields them, adding each row."""
+        collected = self.rows
+        for course_name, output_row in rows:
+            if output_row is not None:
+                collected.append(output_row)
+                if len(collected) >= PARQUET_BATCH_ROWS:
+                    self.flush()
+                    collected = self.rows
+            yield course_name, output_row
+
+    def extend(self, course_rows):
+        """Add a list of output rows."""
+        self.rows += course_rows
+        if len(self.rows) >= PARQUET_BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        """Write the rows collected so far into the temporary dataset, one file per partition they fall in."""
+        import urllib.parse
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.rows:
+            return
+        partitions = {}
+        if self.partition_by == 'department':
+            departments = self.departments
+            for row in self.rows:
+                course_name = row[0]
+                department = departments.get(course_name)
+                if department is None:
+                    department = departments[course_name] = get_department(course_name)
+                partitions.setdefault(department, []).append(row)
+        else:
+            for row in self.rows:
+                partitions.setdefault(row[0], []).append(row)
+        self.rows = []
+        for key, rows in partitions.items():
+            # Named as pyarrow's Hive partitioning names them, so ds.dataset(partitioning='hive') reads them back.
+            partition_dir = os.path.join(self.temp_dir, f'{self.partition_by}={urllib.parse.quote(key, safe="")}')
+            os.makedirs(partition_dir, exist_ok=True)
+            table = pa.table([pa.array(column, pa.string()) for column in zip(*rows)], names=self.columns)
+            pq.write_table(table, os.path.join(partition_dir, f'part-{self.batches_written}.parquet'))
+        self.batches_written += 1
+
+    def close(self, commit=True):
+        """Write the last batch and swap the dataset into dataset_dir, or discard it if commit is False."""
+        import shutil
+
+        old_dir = get_temp_path(self.dataset_dir + '.old')
+        try:
+            if not commit:
+                return
+            self.flush()
+            os.makedirs(self.temp_dir, exist_ok=True)
+            # dataset_dir is briefly missing between the two renames, but never holds a partial dataset.
+            if os.path.exists(self.dataset_dir):
+                os.replace(self.dataset_dir, old_dir)
+            os.replace(self.temp_dir, self.dataset_dir)
+        finally:
+            self.rows = []
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def open_parquet_export(dataset_dir, desired_columns, partition_by='course'):
+    """Return a ParquetExport into dataset_dir, or a context manager giving None if dataset_dir is None."""
+    import contextlib
+
+    if dataset_dir is None:
+        return contextlib.nullcontext()
+    return ParquetExport(dataset_dir, desired_columns, partition_by)
+
+
+def write_file_atomically(path, data):
+    """Write data to path through a temporary file, so readers never see a partial file."""
+    temp_path = get_temp_path(path)
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -2,10 +2,38 @@ import csv
 import os
 import datetime
 import time
-import pandas as pd
 import sys
-from tqdm import tqdm
-from concurrent.futures import ProcessPoolExecutor, as_completed
+
+class DedupIndex:
+    """Track the row identities (compare_row keys) seen so far.
+
+    With pack (the default), each key, a tuple of strings, is stored packed
+    into one bytes object, which is much smaller than the tuple and its
+    strings when the rows themselves are streamed away. Callers that keep
+    every row anyway pass pack=False, so the stored key shares its strings
+    with the kept rows instead of copying them; any hashable key works then.
+    """
+
+    def __init__(self, pack=True):
+        self.keys = set()
+        self.pack = pack
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return (self._pack(key) if self.pack else key) in self.keys
+
+    def add(self, key):
+        """Record key and return True if it had not been seen before."""
+        keys = self.keys
+        size = len(keys)
+        keys.add(self._pack(key) if self.pack else key)
+        return len(keys) != size
+
+    @staticmethod
+    def _pack(key):
+        return '\x1f'.join(key).encode('utf-8', 'surrogatepass')
 
 def get_classes(file):
     """Retrieve unique class names from a CSV file."""
@@ -54,6 +82,8 @@ def make_tree(input_file, output_dir):
         directory_path = make_dir(output_dir)
         date = get_current_datetime('%m-%d')
         list_of_files = get_classes(input_file)
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from tqdm import tqdm
         
         # Use ProcessPoolExecutor to create files concurrently
         with ProcessPoolExecutor() as executor:
@@ -72,7 +102,7 @@ def make_tree(input_file, output_dir):
 
 def get_filtered_rows(course_name, reader, tuition_filter_list):
     """Get filtered rows for a specific course."""
-    seen = set()
+    seen = DedupIndex()
     filtered_rows = []
 
     bosp_filter = 'BOSP' in tuition_filter_list
@@ -114,9 +144,8 @@ def get_filtered_rows(course_name, reader, tuition_filter_list):
                     first_name.strip(),
                     row['SUNet ID']
                 )
-                if compare_row not in seen:
+                if seen.add(compare_row):
                     filtered_rows.append(output_row)
-                    seen.add(compare_row)
 
     return filtered_rows
 
@@ -154,8 +183,11 @@ def fill_one_file(course_name, input_file, directory_path, tuition_filter_list):
 
 
 
-def compute(name_of_file, output_dir, tuition_filter_list):
-    """Main computation function to create and fill class files based on input and filters."""
+def compute(name_of_file, output_dir, tuition_filter_list, progress=None):
+    """Main computation function to create and fill class files based on input and filters.
+
+    progress, if given, is called as progress(courses_written, total_courses) after each course.
+    """
     if not name_of_file:
         sys.exit("ERROR: Filename not provided.")
     
@@ -167,17 +199,22 @@ def compute(name_of_file, output_dir, tuition_filter_list):
         print(f'Operating on file {csv_file}')
         print(f'Filtering by: {tuition_filter_list}')
         directory_path, list_of_files = make_tree(csv_file, output_dir)
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from tqdm import tqdm
 
         # Use ProcessPoolExecutor to fill files concurrently
         with ProcessPoolExecutor() as executor:
             futures = {executor.submit(fill_one_file, file, csv_file, directory_path, tuition_filter_list): file for file in list_of_files}
-            for future in tqdm(as_completed(futures), total=len(futures), desc="Filling CSV files", unit="file"):
+            for done, future in enumerate(tqdm(as_completed(futures), total=len(futures), desc="Filling CSV files", unit="file"), 1):
                 try:
                     future.result()  # Check for exceptions
                 except Exception as e:
                     print(f"Error processing file {futures[future]}: {e}")
+                if progress:
+                    progress(done, len(futures))
 
         print("\nComplete!")
+        return directory_path
     except Exception as e:
         print(f"Error during computation: {e}")
         raise
@@ -2,7 +2,6 @@ import csv
 import os
 import datetime
 import time
-import pandas as pd
 import sys
 
 
@@ -15,6 +14,8 @@ def xlsx_to_csv(input_file, output_file):
     Returns:
         None
     """
+    # Import pandas here so that only XLSX conversion pays for loading it
+    import pandas as pd
     # Read the XLSX file into a pandas DataFrame
     df = pd.read_excel(input_file)
     # Save the DataFrame as a CSV file
@@ -23,6 +24,38 @@ def xlsx_to_csv(input_file, output_file):
     print("Conversion from XLSX to CSV completed successfully.")
 
 
+class DedupIndex:
+    """Track the row identities (compare_row keys) seen so far.
+
+    With pack (the default), each key, a tuple of strings, is stored packed
+    into one bytes object, which is much smaller than the tuple and its
+    strings when the rows themselves are streamed away. Callers that keep
+    every row anyway pass pack=False, so the stored key shares its strings
+    with the kept rows instead of copying them; any hashable key works then.
+    """
+
+    def __init__(self, pack=True):
+        self.keys = set()
+        self.pack = pack
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return (self._pack(key) if self.pack else key) in self.keys
+
+    def add(self, key):
+        """Record key and return True if it had not been seen before."""
+        keys = self.keys
+        size = len(keys)
+        keys.add(self._pack(key) if self.pack else key)
+        return len(keys) != size
+
+    @staticmethod
+    def _pack(key):
+        return '\x1f'.join(key).encode('utf-8', 'surrogatepass')
+
+
 def getClasses(file):
     """
     Retrieves unique entries from a CSV file column.
@@ -189,7 +222,7 @@ def fillOneFile(course_name, input_file, directory_path, tuition_filter_list):
     with open(input_file, 'r') as csv_input, open(output_file, 'w', newline='') as csv_output:
         reader = csv.DictReader(csv_input)
         writer = csv.DictWriter(csv_output, fieldnames=desired_columns)
-        seen = []  # Keep track of rows already written to avoid duplicates
+        seen = DedupIndex()  # Keep track of rows already written to avoid duplicates
         writer.writerow(main_heading_row)  # Write the main heading row
         writer.writeheader()  # Write the column headers
         for row in reader:
@@ -218,10 +251,9 @@ def fillOneFile(course_name, input_file, directory_path, tuition_filter_list):
                             'First Name': first_name.strip(),  # Remove leading/trailing spaces from first name
                             'SUNet ID': row['SUNet ID'],
                         }
-                        if compare_row not in seen:
+                        if seen.add(tuple(compare_row.values())):
                             # Write the row to the output file
                             writer.writerow(output_row)
-                            seen.append(compare_row)
                 else:
                     last_name, first_name = row['Last First Name'].split(',', 1)
                     # Create a new dictionary with desired columns
@@ -243,10 +275,9 @@ def fillOneFile(course_name, input_file, directory_path, tuition_filter_list):
                         'First Name': first_name.strip(),  # Remove leading/trailing spaces from first name
                         'SUNet ID': row['SUNet ID'],
                     }
-                    if compare_row not in seen:
+                    if seen.add(tuple(compare_row.values())):
                         # Write the row to the output file
                         writer.writerow(output_row)
-                        seen.append(compare_row)
 
 
     # print(f"Data for course {course_name.replace(' ', '')} has been extracted and saved to {output_file}")
@@ -2,10 +2,38 @@ import csv
 import os
 import datetime
 import time
-import pandas as pd
 import sys
-from tqdm import tqdm
-from concurrent.futures import ProcessPoolExecutor, as_completed
+
+class DedupIndex:
+    """Track the row identities (compare_row keys) seen so far.
+
+    With pack (the default), each key, a tuple of strings, is stored packed
+    into one bytes object, which is much smaller than the tuple and its
+    strings when the rows themselves are streamed away. Callers that keep
+    every row anyway pass pack=False, so the stored key shares its strings
+    with the kept rows instead of copying them; any hashable key works then.
+    """
+
+    def __init__(self, pack=True):
+        self.keys = set()
+        self.pack = pack
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return (self._pack(key) if self.pack else key) in self.keys
+
+    def add(self, key):
+        """Record key and return True if it had not been seen before."""
+        keys = self.keys
+        size = len(keys)
+        keys.add(self._pack(key) if self.pack else key)
+        return len(keys) != size
+
+    @staticmethod
+    def _pack(key):
+        return '\x1f'.join(key).encode('utf-8', 'surrogatepass')
 
 def get_classes(file):
     """Retrieve unique class names from a CSV file."""
@@ -55,6 +83,8 @@ def make_tree(input_file):
         directory_path = make_dir()
         date = get_current_datetime('%m-%d')
         list_of_files = get_classes(input_file)
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from tqdm import tqdm
         
         # Use ProcessPoolExecutor to create files concurrently
         with ProcessPoolExecutor() as executor:
@@ -98,7 +128,7 @@ def fill_one_file(course_name, input_file, directory_path, tuition_filter_list):
         with open(input_file, 'r') as csv_input, open(output_file, 'w', newline='') as csv_output:
             reader = csv.DictReader(csv_input)
             writer = csv.DictWriter(csv_output, fieldnames=desired_columns)
-            seen = set()
+            seen = DedupIndex()
             writer.writerow(main_heading_row)
             writer.writeheader()
             for row in reader:
@@ -129,9 +159,8 @@ def fill_one_file(course_name, input_file, directory_path, tuition_filter_list):
                             first_name.strip(),
                             row['SUNet ID']
                         )
-                        if compare_row not in seen:
+                        if seen.add(compare_row):
                             writer.writerow(output_row)
-                            seen.add(compare_row)
                     elif not filter_on and not bosp_filter:
                         last_name, first_name = row['Last First Name'].split(',', 1)
                         bosp = ''
@@ -156,9 +185,8 @@ def fill_one_file(course_name, input_file, directory_path, tuition_filter_list):
                             first_name.strip(),
                             row['SUNet ID']
                         )
-                        if compare_row not in seen:
+                        if seen.add(compare_row):
                             writer.writerow(output_row)
-                            seen.add(compare_row)
 
     except Exception as e:
         print(f"Error filling file {course_name}: {e}")
@@ -177,6 +205,8 @@ def compute(name_of_file, tuition_filter_list):
         print(f'Operating on file {csv_file}')
         print(f'Filtering by: {tuition_filter_list}')
         directory_path, list_of_files = make_tree(csv_file)
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from tqdm import tqdm
 
         # Use ProcessPoolExecutor to fill files concurrently
         with ProcessPoolExecutor() as executor:
@@ -1,11 +1,15 @@
 import os
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import subprocess
 import threading
 
+import process5
+
 csv_file_path = ""
 output_dir = ""
+# Latest progress reported by the engine, and the outcome of the last run. Written by the
+# worker thread and read by poll_progress on the Tk thread.
+run_state = {'running': False, 'progress': None, 'result': None, 'error': None}
 
 # Function to select the CSV file
 def select_csv():
@@ -32,6 +36,9 @@ def select_output_dir():
 
 # Function to handle the deploy button click
 def deploy():
+    if run_state['running']:
+        return
+
     if not csv_file_path:
         messagebox.showerror("Error", "No CSV file selected.")
         return
@@ -43,77 +50,103 @@ def deploy():
     selected_indices = listbox.curselection()
     selected_values = [options[idx] for idx in selected_indices]
 
-    # Start the progress bar and run the process5.py script in a separate thread to keep the GUI responsive
-    progress_bar.start()
-    threading.Thread(target=run_process_script, args=(csv_file_path, output_dir, selected_values)).start()
+    # Run the engine in a separate thread to keep the GUI responsive, and poll its progress
+    run_state.update(running=True, progress=None, result=None, error=None)
+    deploy_button.config(state=tk.DISABLED)
+    progress_bar['value'] = 0
+    status_label.config(text="Starting...")
+    threading.Thread(target=run_process, args=(csv_file_path, output_dir, selected_values), daemon=True).start()
+    root.after(100, poll_progress)
+
+# Function to run the engine in this process; it must not touch any Tk widgets
+def run_process(csv_file_path, output_dir, selected_values):
+    def report(courses_written, total_courses):
+        run_state['progress'] = (courses_written, total_courses)
 
-# Function to run the process5.py script with two arguments
-def run_process_script(csv_file_path, output_dir, selected_values):
     try:
-        process5_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'process5.py')
-        cmd = ['python', process5_path, csv_file_path, output_dir] + selected_values
-        print("Command for program:", cmd)
-        subprocess.run(cmd, shell=True)
-    except FileNotFoundError:
-        messagebox.showerror("Python File Not Found", "Error: process5.py not found!")
-    except Exception as e:
-        messagebox.showerror("Error", str(e))
+        run_state['result'] = process5.compute(csv_file_path, output_dir, selected_values, progress=report)
+    except (Exception, SystemExit) as e:
+        run_state['error'] = str(e)
     finally:
-        progress_bar.stop()
-        root.quit()  # Close the GUI window after processing
+        run_state['running'] = False
+
+# Function to update the progress bar from the engine's latest report
+def poll_progress():
+    progress = run_state['progress']
+    if progress:
+        courses_written, total_courses = progress
+        progress_bar['value'] = 100 * courses_written / total_courses if total_courses else 100
+        status_label.config(text=f"{courses_written:,} of {total_courses:,} rosters written")
+
+    if run_state['running']:
+        root.after(100, poll_progress)
+        return
+
+    deploy_button.config(state=tk.NORMAL)
+    if run_state['error']:
+        status_label.config(text="Failed.")
+        messagebox.showerror("Error", run_state['error'])
+    else:
+        progress_bar['value'] = 100
+        status_label.config(text=f"Done. Rosters saved to {os.path.basename(run_state['result'])}")
 
-# Create the main window
-root = tk.Tk()
-root.title("SCPD Auto Parser")
+# Build the window only when run as a script, so process pool workers that re-import
+# this module (spawn start method on macOS and Windows) do not open windows of their own
+if __name__ == '__main__':
+    # Create the main window
+    root = tk.Tk()
+    root.title("SCPD Auto Parser")
 
-# Create a style for the button
-style = ttk.Style()
-style.configure("Blue.TButton", background="blue")
+    # Create a style for the button
+    style = ttk.Style()
+    style.configure("Blue.TButton", background="blue")
 
-instruction_label = tk.Label(root, text="This program takes in a Roster CSV file, sorts it per class, and applies filters if any.", justify=tk.LEFT)
-instruction_label.pack(pady=10)
+    instruction_label = tk.Label(root, text="This program takes in a Roster CSV file, sorts it per class, and applies filters if any.", justify=tk.LEFT)
+    instruction_label.pack(pady=10)
 
-# Heading for the checkboxes
-label1 = tk.Label(root, text="1. Select filters (can do multiple), if any:")
-label1.pack(pady=10)
+    # Heading for the checkboxes
+    label1 = tk.Label(root, text="1. Select filters (can do multiple), if any:")
+    label1.pack(pady=10)
 
-# Create a list of options for the dropdown
-options = ["Honor's Coop - Engineering", "Honor's Coop - Regular", "SCPD NDO", "BOSP"]
+    # Create a list of options for the dropdown
+    options = ["Honor's Coop - Engineering", "Honor's Coop - Regular", "SCPD NDO", "BOSP"]
 
-# Create a Listbox widget for multiple selection
-listbox = tk.Listbox(root, selectmode=tk.MULTIPLE)
-for option in options:
-    listbox.insert(tk.END, option)
-listbox.pack(pady=10)
+    # Create a Listbox widget for multiple selection
+    listbox = tk.Listbox(root, selectmode=tk.MULTIPLE)
+    for option in options:
+        listbox.insert(tk.END, option)
+    listbox.pack(pady=10)
 
-label2 = tk.Label(root, text="2. Choose the input Roster CSV file:")
-label2.pack(pady=10)
+    label2 = tk.Label(root, text="2. Choose the input Roster CSV file:")
+    label2.pack(pady=10)
 
-# Create buttons for selecting CSV file and output directory
-csv_button = tk.Button(root, text="Select Roster File (csv)", command=select_csv, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=20)
-csv_button.pack(pady=5)
-csv_label = tk.Label(root, text="")
-csv_label.pack(pady=5)
+    # Create buttons for selecting CSV file and output directory
+    csv_button = tk.Button(root, text="Select Roster File (csv)", command=select_csv, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=20)
+    csv_button.pack(pady=5)
+    csv_label = tk.Label(root, text="")
+    csv_label.pack(pady=5)
 
-label3 = tk.Label(root, text="3. Choose where to save the output files:")
-label3.pack(pady=10)
+    label3 = tk.Label(root, text="3. Choose where to save the output files:")
+    label3.pack(pady=10)
 
-output_button = tk.Button(root, text="Select Output Folder", command=select_output_dir, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=25)
-output_button.pack(pady=5)
-output_label = tk.Label(root, text="")
-output_label.pack(pady=5)
+    output_button = tk.Button(root, text="Select Output Folder", command=select_output_dir, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=25)
+    output_button.pack(pady=5)
+    output_label = tk.Label(root, text="")
+    output_label.pack(pady=5)
 
 
-label4 = tk.Label(root, text="4. Finally, deploy program to have it do its magic:")
-label4.pack(pady=10)
+    label4 = tk.Label(root, text="4. Finally, deploy program to have it do its magic:")
+    label4.pack(pady=10)
 
-# Create a button to deploy the program
-deploy_button = tk.Button(root, text="Deploy", command=deploy, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=40)
-deploy_button.pack(pady=20)
+    # Create a button to deploy the program
+    deploy_button = tk.Button(root, text="Deploy", command=deploy, borderwidth=3, highlightbackground='blue', highlightcolor="blue", padx=40)
+    deploy_button.pack(pady=20)
 
-# Create a progress bar
-progress_bar = ttk.Progressbar(root, mode='indeterminate')
-progress_bar.pack(pady=10)
+    # Create a progress bar
+    progress_bar = ttk.Progressbar(root, mode='determinate', maximum=100, length=300)
+    progress_bar.pack(pady=10)
+    status_label = tk.Label(root, text="")
+    status_label.pack(pady=5)
 
-# Start the GUI main loop
-root.mainloop()
+    # Start the GUI main loop
+    root.mainloop()
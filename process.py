@@ -1,8 +1,6 @@
 import csv
 import os
 import datetime
-import time
-import pandas as pd
 
 
 def xlsx_to_csv(input_file, output_file):
@@ -14,6 +12,8 @@ def xlsx_to_csv(input_file, output_file):
     Returns:
         None
     """
+    # Import pandas here so that only XLSX conversion pays for loading it
+    import pandas as pd
     # Read the XLSX file into a pandas DataFrame
     df = pd.read_excel(input_file)
     # Save the DataFrame as a CSV file
@@ -22,6 +22,38 @@ def xlsx_to_csv(input_file, output_file):
     print("Conversion from XLSX to CSV completed successfully.")
 
 
+class DedupIndex:
+    """Track the row identities (compare_row keys) seen so far.
+
+    With pack (the default), each key, a tuple of strings, is stored packed
+    into one bytes object, which is much smaller than the tuple and its
+    strings when the rows themselves are streamed away. Callers that keep
+    every row anyway pass pack=False, so the stored key shares its strings
+    with the kept rows instead of copying them; any hashable key works then.
+    """
+
+    def __init__(self, pack=True):
+        self.keys = set()
+        self.pack = pack
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return (self._pack(key) if self.pack else key) in self.keys
+
+    def add(self, key):
+        """Record key and return True if it had not been seen before."""
+        keys = self.keys
+        size = len(keys)
+        keys.add(self._pack(key) if self.pack else key)
+        return len(keys) != size
+
+    @staticmethod
+    def _pack(key):
+        return '\x1f'.join(key).encode('utf-8', 'surrogatepass')
+
+
 def getClasses(file):
     """
     Retrieves unique entries from a CSV file column.
@@ -98,53 +130,18 @@ def makeDir():
     return directory_path
 
 
-def makeOneFile(file_path):
-    """
-    Creates a new file at the specified file path.
-    Args:
-        file_path (str): The path of the file to be created.
-    Returns:
-        None
-    """
-    try:
-        # Create the file
-        open(file_path, 'a').close()
-        # Extract the file name from the file path
-        file_ = file_path.split(os.sep)
-        file = file_[-1]
-        # Print a success message
-        print(file + " created successfully.")
-    except OSError as e:
-        # Print an error message if file creation fails
-        print(f"Error creating the file: {e}")
-
-
-
-def makeTree(input_file):
+def makeTree():
     """
-    Creates a directory and multiple files based on unique entries from an input file.
-    Args:
-        input_file (str): The path of the input file.
+    Creates a directory for the output files.
+    The course files themselves are created when their rows are written.
     Returns:
-        tuple: A tuple containing the directory path and the list of file names created.
+        str: The path of the created directory.
     """
     # Create the directory
     directory_path = makeDir()
-    date = dateTime2()
     print()
-    # Get the list of unique entries from the input file
-    list_of_files = getClasses(input_file)
-    # Iterate over each unique entry and create a file
-    for file in list_of_files:
-        # Construct the file path
-        file_path = os.path.join(directory_path, file.replace(' ', '') + f' SCPD Roster {date}.csv')
-        # Pause for a short duration (0.1 seconds)
-        time.sleep(0.05)
-        # Create the file
-        makeOneFile(file_path)
-    print()
-    # Return the directory path and the list of file names
-    return directory_path, list_of_files
+    # Return the directory path
+    return directory_path
 
 
 def fillOneFile(course_name, input_file, directory_path, tuition_filter_list):
@@ -184,7 +181,7 @@ def fillOneFile(course_name, input_file, directory_path, tuition_filter_list):
     with open(input_file, 'r') as csv_input, open(output_file, 'w', newline='') as csv_output:
         reader = csv.DictReader(csv_input)
         writer = csv.DictWriter(csv_output, fieldnames=desired_columns)
-        seen = []  # Keep track of rows already written to avoid duplicates
+        seen = DedupIndex()  # Keep track of rows already written to avoid duplicates
         writer.writerow(main_heading_row)  # Write the main heading row
         writer.writeheader()  # Write the column headers
         for row in reader:
@@ -204,13 +201,94 @@ def fillOneFile(course_name, input_file, directory_path, tuition_filter_list):
                         'Tuition Group Desc': row['Tuition Group Desc'],
                         'Stu Current Acad Plan Code': row['Stu Current Acad Plan Code']
                     }
-                    if output_row not in seen:
+                    if seen.add(tuple(output_row.values())):
                         # Write the row to the output file
                         writer.writerow(output_row)
-                        seen.append(output_row)
     # print(f"Data for course {course_name.replace(' ', '')} has been extracted and saved to {output_file}")
 
 
+def fillAllFiles(input_file, directory_path, list_of_files, tuition_filter_list, include_empty=False):
+    """
+    Reads the input CSV file once and writes every course's filtered rows to its own CSV file.
+    This produces the same files as calling fillOneFile for each course, without rescanning
+    the input once per course. Courses with no rows left after filtering are skipped.
+    Args:
+        input_file (str): The path of the input CSV file.
+        directory_path (str): The path of the directory to save the output CSV files.
+        list_of_files (list): The course names to write a file for, or None for every course in the input.
+        tuition_filter_list (list): The Tuition Group Desc values to keep.
+        include_empty (bool): Also write header-only files for courses with no rows.
+    Returns:
+        list: The course names a file was written for or skipped, in the order they were handled.
+    """
+    # Construct the output file path
+    date = dateTime2()
+    # Specify the desired columns
+    desired_columns = [
+                    'Course Offering Subject-Num Desc',
+                    'EMPLID', 'Preferred Email Address', 
+                    'Last Name', 
+                    'First Name', 
+                    'SUNet ID', 
+                    'Tuition Group Desc', 
+                    'Stu Current Acad Plan Code']
+    # Collect the rows for every course in a single pass over the input
+    collect_courses = list_of_files is None
+    if collect_courses:
+        list_of_files = []
+    partitions = {course_name: [] for course_name in list_of_files}
+    # Rows are kept as tuples in desired_columns order rather than dicts, and the course, tuition
+    # group and plan code of every kept row share one string object per distinct value
+    course_names = {course_name: course_name for course_name in list_of_files}
+    strings = {}
+    seen = DedupIndex(pack=False)  # Keep track of rows already collected; the rows share their strings
+    with open(input_file, 'r') as csv_input:
+        reader = csv.DictReader(csv_input)
+        for row in reader:
+            course_name = course_names.get(row['Course Offering Subject-Num Desc'])
+            if course_name is None and collect_courses:
+                # Record each course the first time it is seen, whether or not any of its rows are kept
+                course_name = row['Course Offering Subject-Num Desc']
+                course_names[course_name] = course_name
+                partitions[course_name] = []
+                list_of_files.append(course_name)
+            tuition_group = row["Tuition Group Desc"]
+            # Tuition Group Filter
+            if course_name is not None and tuition_group in tuition_filter_list:
+                # Split Last First Name into Last Name and First Name using ',' as the delimiter
+                last_name, first_name = row['Last First Name'].split(',', 1)
+                plan_code = row['Stu Current Acad Plan Code']
+                output_row = (
+                    course_name,
+                    row['EMPLID'],
+                    row['Preferred Email Address'],
+                    last_name,
+                    first_name.strip(),  # Remove leading/trailing spaces from first name
+                    row['SUNet ID'],
+                    strings.setdefault(tuition_group, tuition_group),
+                    strings.setdefault(plan_code, plan_code)
+                )
+                if seen.add(output_row):
+                    partitions[course_name].append(output_row)
+    # Write each course's rows to its output file
+    for task, course_name in enumerate(list_of_files):
+        percentage = int((task + 1) / len(list_of_files) * 100)
+        print(f"Extracting contents for {course_name}, \t {percentage}% complete", end='\r')
+        # Skip courses that have nothing left after filtering
+        if not partitions[course_name] and not include_empty:
+            continue
+        output_file = os.path.join(directory_path, f'{course_name.replace(" ", "")} SCPD Roster {date}.csv')
+        # Create the main heading row
+        main_heading_row = [f'Course: {course_name}'] + [''] * (len(desired_columns) - 1)
+        with open(output_file, 'w', newline='') as csv_output:
+            writer = csv.writer(csv_output)
+            writer.writerow(main_heading_row)  # Write the main heading row
+            writer.writerow(desired_columns)  # Write the column headers
+            writer.writerows(partitions[course_name])
+    # Return the course names
+    return list_of_files
+
+
 def main():
     """
     Entry point of the program.
@@ -240,6 +318,9 @@ def main():
 
     print('Filtering by: ', tuition_filter_list)
 
+    # Ask whether courses with no rows left after filtering still get a header-only file
+    include_empty = input('Also create files for courses with no matching students? (y/N): ').strip().lower() == 'y'
+
     #################
 
     # Prompt the user for a file name
@@ -248,19 +329,10 @@ def main():
     csv = INPUT + '.csv'
     current_dir = os.path.dirname(os.path.abspath(__file__))
     csv = os.path.join(current_dir, csv)
-    # Create the directory tree and retrieve the list of files
-    directory_path, list_of_files = makeTree(csv)
-    # Iterate over each file and extract/fill its contents
-    for task, file in enumerate(list_of_files):
-        progress = (task + 1) / len(list_of_files)
-        percentage = int(progress * 100)
-        tab = '\t'
-        # time.sleep(0.5)
-        # Print the progress and percentage completion
-        print('----------------------------------------------------------', end='\r')
-        print(f"Extracting contents for {file}, {tab} {percentage}% complete", end='\r')
-        # Fill the contents of the file
-        fillOneFile(file, csv, directory_path, tuition_filter_list)
+    # Create the output directory
+    directory_path = makeTree()
+    # Extract and fill the contents of every file in a single pass over the input, which also finds the courses
+    fillAllFiles(csv, directory_path, None, tuition_filter_list, include_empty)
     print()
     print()
     print('Complete!')